@@ -1,14 +1,94 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template_string
-import psycopg
+from flask import Flask, request, jsonify, send_from_directory, render_template, g
+from werkzeug.security import safe_join
+from psycopg_pool import PoolTimeout, TooManyRequests
 import os
+import base64
+import time
+import gzip
+import hashlib
+import threading
 from datetime import datetime
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from flask import request, Response
 import json
-
-
-app = Flask(__name__, static_folder='.', static_url_path='')
-
+import csv
+import io
+import re
+import logging
+import mimetypes
+
+from db import get_db, pool_stats, read_pool_waiting, start_db_timer, slow_queries
+from cache import TTLCache, SingleFlight, MISS
+from metrics import registry, SIZE_BUCKETS
+from compression import CompressionMiddleware, choose_encoding
+from assets import IMMUTABLE_CACHE_CONTROL, asset_url, resolve_fingerprinted, page_path
+from feeds import FEEDS, PROPERTY_FILTERS, SEARCH_SQL, BULK_SEARCH_SQL, SUGGEST_SQL, SUGGEST_PREFIX_SQL
+
+
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger("crmvic")
+
+# Static files are served by serve_static below (Flask's own static route would shadow it)
+app = Flask(__name__, static_folder=None)
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size=int(os.environ.get("COMPRESS_MIN_SIZE", 1024)))
+
+
+# === Request Metrics ===
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency by endpoint", ("endpoint", "method"))
+REQUEST_COUNT = registry.counter(
+    "http_requests_total", "Requests by endpoint and status code", ("endpoint", "method", "status"))
+RESPONSE_SIZE = registry.histogram(
+    "http_response_size_bytes", "Response body size by endpoint", ("endpoint",), buckets=SIZE_BUCKETS)
+DB_WAIT = registry.histogram(
+    "db_connection_wait_seconds", "Time per request spent waiting for a pooled connection", ("endpoint",))
+DB_EXECUTE = registry.histogram(
+    "db_execute_seconds", "Time per request spent executing statements", ("endpoint",))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.db_timer = start_db_timer()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get("request_start")
+    if start is None:
+        return response
+
+    endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+    REQUEST_LATENCY.observe((endpoint, request.method), time.perf_counter() - start)
+    REQUEST_COUNT.inc((endpoint, request.method, str(response.status_code)))
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe((endpoint,), response.content_length)
+
+    db_timer = g.db_timer
+    if db_timer["queries"] or db_timer["wait"]:
+        DB_WAIT.observe((endpoint,), db_timer["wait"])
+        DB_EXECUTE.observe((endpoint,), db_timer["execute"])
+    return response
+
+@registry.collector
+def pool_metrics():
+    stats = pool_stats()
+    yield "db_pool_connections", "gauge", "Pooled connections by state", ("state",), [
+        (("in_use",), stats["in_use"]), (("idle",), stats["idle"])]
+    yield "db_pool_waiting", "gauge", "Requests waiting for a pooled connection", (), [((), stats["waiting"])]
+
+    replica = stats["replica"]
+    if replica["enabled"]:
+        yield "db_replica_healthy", "gauge", "1 while reads are routed to the replica", (), [((), int(replica["healthy"]))]
+        if replica["lag_seconds"] is not None:
+            yield "db_replica_lag_seconds", "gauge", "Replica replay lag at the last check", (), [((), replica["lag_seconds"])]
+        yield "db_replica_reads_total", "counter", "Read-only checkouts by where they were served", ("target",), [
+            (("replica",), replica["reads"]), (("primary_fallback",), replica["fallbacks"])]
+
+@app.route("/metrics")
+def metrics():
+    return app.response_class(registry.render(), mimetype="text/plain; version=0.0.4")
 
 def check_auth(username, password):
     return username == "pol0sho" and password == "pol0sho"
@@ -32,79 +112,310 @@ def index():
     auth_result = require_auth()
     if auth_result:
         return auth_result
-    return send_from_directory('.', 'index.html')
+    return send_static(*page_path('index.html'))
 
 # ✅ Catch-all route for unknown paths (optional but helpful)
 @app.errorhandler(404)
 def not_found(e):
-    return send_from_directory('.', 'index.html')
+    return send_static(*page_path('index.html'))
 
 # === DB Connection ===
-def get_db():
-    return psycopg.connect(
-        dbname="inmosuite",
-        user="inmosuite_user",
-        password="GlNtF89gavaJzBX3Vv3jGyzPe3vdOwGM",
-        host="dpg-d1smp82li9vc73c8hsr0-a.frankfurt-postgres.render.com",
-        port="5432",
-        sslmode="require",
-        row_factory=psycopg.rows.dict_row
-    )
+# get_db() hands out pooled connections, see db.py. Reads that tolerate replica lag
+# pass readonly=True (served by DATABASE_REPLICA_URL when set and healthy); writes use the primary.
+# Feed reads also pass min_lsn=feed_lsn(...) so they never see a replica from before the last import
+
+# Pool exhausted (timeout or too many waiters) -> tell the client to back off
+@app.errorhandler(PoolTimeout)
+@app.errorhandler(TooManyRequests)
+def pool_busy(e):
+    return jsonify(error="Database busy, try again"), 503, {"Retry-After": "1"}
+
+@app.route("/api/db/pool")
+def db_pool_stats():
+    return jsonify(pool_stats())
+
+@app.route("/api/admin/slow-queries")
+def slow_query_log():
+    auth_result = require_auth()
+    if auth_result:
+        return auth_result
+    return jsonify(slow_queries=slow_queries())
 
 
 # === Serve Frontend Files ===
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+def send_static(directory, path):
+    """send_from_directory, preferring a precompressed .br/.gz sibling the client accepts."""
+    available = []
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+        candidate = safe_join(directory, path + suffix)
+        if candidate and os.path.isfile(candidate):
+            available.append(encoding)
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"), available) if available else None
+    if encoding is None:
+        return send_from_directory(directory, path)
+
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    response = send_from_directory(directory, path + PRECOMPRESSED_SUFFIXES[encoding], mimetype=mimetype)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
 @app.route("/")
 def serve_index():
-    return send_from_directory(".", "index.html")
+    return send_static(*page_path("index.html"))
 
 @app.route("/<path:path>")
 def serve_static(path):
-    return send_from_directory(".", path)
+    # Content-hashed files (build_assets.py, or hashed at runtime) never change under their URL
+    fingerprinted = resolve_fingerprinted(path)
+    if fingerprinted:
+        response = send_static(*fingerprinted)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+    return send_static(".", path)
+
+# === Cursor Pagination ===
+# Cursors are the last seen sort key, base64-encoded so clients treat them as opaque
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii")
+
+def decode_cursor(token):
+    """Raises ValueError on a malformed cursor."""
+    return json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+
+# === Property Page Cache ===
+PROPERTY_FEEDS = tuple(FEEDS)  # see feeds.py
+MAX_PER_PAGE = int(os.environ.get("MAX_PER_PAGE", 200))
+
+# TTL per feed in seconds: PROPERTY_CACHE_TTL, overridable per feed with PROPERTY_CACHE_TTL_<FEED>
+PROPERTY_CACHE_TTL = int(os.environ.get("PROPERTY_CACHE_TTL", 300))
+property_cache = TTLCache(
+    "properties",
+    max_bytes=int(os.environ.get("PROPERTY_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    default_ttl=PROPERTY_CACHE_TTL,
+    ttls={feed: int(os.environ.get(f"PROPERTY_CACHE_TTL_{feed.upper()}", PROPERTY_CACHE_TTL))
+          for feed in PROPERTY_FEEDS},
+)
+
+# === Feed Versions ===
+# feed_versions holds a counter per feed that import jobs bump (via invalidate_feed). It is part of
+# every property page's cache key and ETag, so a bump invalidates both, in every worker process.
+# Each bump also records the primary's WAL position: until the replica has replayed past it, the
+# feed's reads stay on the primary, so the new version's keys and ETags never get pre-import data.
+FEED_VERSION_TTL = float(os.environ.get("FEED_VERSION_TTL", 5))  # how stale another worker's bump may be seen
+_feed_versions = {}  # feed -> (version, lsn)
+_feed_versions_loaded_at = 0.0
+_feed_versions_lock = threading.Lock()
+
+def _feed_state(feed):
+    global _feed_versions, _feed_versions_loaded_at
+    if time.monotonic() - _feed_versions_loaded_at >= FEED_VERSION_TTL:
+        with _feed_versions_lock:
+            if time.monotonic() - _feed_versions_loaded_at >= FEED_VERSION_TTL:
+                with get_db() as conn:
+                    rows = conn.execute("""
+                        SELECT feed, version, COALESCE(lsn - '0/0'::pg_lsn, 0) AS lsn FROM feed_versions
+                    """).fetchall()
+                _feed_versions = {r["feed"]: (r["version"], int(r["lsn"])) for r in rows}
+                _feed_versions_loaded_at = time.monotonic()
+    return _feed_versions.get(feed, (0, 0))
+
+def feed_version(feed):
+    return _feed_state(feed)[0]
+
+def feed_lsn(*feeds):
+    """WAL position of the last bump of these feeds (default: all), see get_db(min_lsn=...)."""
+    return max(_feed_state(feed)[1] for feed in feeds or PROPERTY_FEEDS)
+
+def bump_feed_version(feed):
+    with get_db() as conn:
+        row = conn.execute("""
+            INSERT INTO feed_versions (feed, lsn) VALUES (%s, pg_current_wal_lsn())
+            ON CONFLICT (feed) DO UPDATE
+            SET version = feed_versions.version + 1, lsn = EXCLUDED.lsn, updated_at = now()
+            RETURNING version, lsn - '0/0'::pg_lsn AS lsn
+        """, (feed,)).fetchone()
+    with _feed_versions_lock:
+        _feed_versions[feed] = (row["version"], int(row["lsn"]))
+    return row["version"]
+
+def invalidate_feed(feed):
+    """Call after a feed import so the next requests see the new data."""
+    bump_feed_version(feed)
+    suggest_cache.clear()
+    search_cache.clear()  # every entry depends on every feed; version keys cover other workers
+    # old-version pages can no longer be hit; drop them now rather than waiting for the TTL
+    return property_cache.invalidate(feed)
+
+# One in-flight query per page key; concurrent misses wait for it instead of querying too
+property_flight = SingleFlight("properties")
+
+def get_properties_cached(feed, page, per_page, after_ref=None, filters=(), version=None):
+    key = (feed, page, per_page, after_ref, filters, version)
+    cached = property_cache.get(key)
+    if cached is not MISS:
+        return cached
+
+    def load():
+        # a flight that finished just before we joined may already have filled the cache
+        cached = property_cache.get(key)
+        if cached is not MISS:
+            return cached
+        result = fetch_properties_page(feed, page, per_page, after_ref, filters)
+        property_cache.set(key, result, namespace=feed)
+        return result
+
+    return property_flight.do(key, load)
+
+# === Next Page Prefetch ===
+# After serving a page with has_next, warm the following page(s) in the background so the
+# next click is a cache hit. Capped so prefetching can never crowd out real requests.
+PREFETCH_DEPTH = min(max(int(os.environ.get("PREFETCH_DEPTH", 1)), 0), 5)            # pages ahead, 0 disables
+PREFETCH_CONCURRENCY = min(max(int(os.environ.get("PREFETCH_CONCURRENCY", 2)), 1), 4)  # DB connections used at most
+PREFETCH_MAX_PENDING = int(os.environ.get("PREFETCH_MAX_PENDING", 16))                # queued prefetches, extra are dropped
+
+PREFETCHES = registry.counter(
+    "property_prefetch_total", "Background next-page prefetches by outcome", ("outcome",))
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_CONCURRENCY, thread_name_prefix="property-prefetch")
+_prefetch_pending = set()
+_prefetch_lock = threading.Lock()
+
+def next_page_key(key, properties):
+    """
+    Cache key (feed, page, per_page, after_ref, filters, version) of the page a client asks for next:
+    by cursor if it paged by cursor (or from page 1), else by page number.
+    """
+    feed, page, per_page, after_ref, filters, version = key
+    if after_ref is not None or page == 1:
+        return (feed, 1, per_page, properties[-1]["ref"], filters, version)
+    return (feed, page + 1, per_page, None, filters, version)
+
+def schedule_prefetch(key, properties, has_next):
+    if PREFETCH_DEPTH == 0 or not has_next or not properties:
+        return
+    key = next_page_key(key, properties)
+    if key in property_cache:
+        return
+    with _prefetch_lock:
+        if key in _prefetch_pending:
+            return
+        if len(_prefetch_pending) >= PREFETCH_MAX_PENDING:
+            PREFETCHES.inc(("dropped",))
+            return
+        _prefetch_pending.add(key)
+    PREFETCHES.inc(("scheduled",))
+    _prefetch_executor.submit(_prefetch, key)
+
+def _prefetch(key):
+    try:
+        page_key = key
+        for _ in range(PREFETCH_DEPTH):
+            if read_pool_waiting():
+                PREFETCHES.inc(("skipped_busy",))  # requests are queueing for connections, back off
+                return
+            properties, has_next = get_properties_cached(*page_key)
+            if not has_next or not properties:
+                return
+            page_key = next_page_key(page_key, properties)
+    except Exception:
+        PREFETCHES.inc(("failed",))
+        logger.warning("Prefetch of %r failed", key, exc_info=True)
+    finally:
+        with _prefetch_lock:
+            _prefetch_pending.discard(key)
+
+# === Cover Images ===
+# {feed}_cover_images holds each listing's image_order = 1 image keyed by the listing column it joins on
+# (migrations/005_cover_images.sql)
+def refresh_cover_images(feed):
+    """
+    Sync {feed}_cover_images with the feed's images after an import.
+    Only covers that changed are written; listings that lost their cover are removed.
+    """
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            cur.execute(FEEDS[feed].cover_upsert_sql)
+            updated = cur.rowcount
+            cur.execute(FEEDS[feed].cover_prune_sql)
+            removed = cur.rowcount
 
-# === Cached Fetch Function ===
-@lru_cache(maxsize=128)  # Cache up to 128 unique (feed, page, per_page) combinations
-def get_properties_cached(feed, page, per_page):
+    logger.info("Refreshed %s cover images: %d updated, %d removed", feed, updated, removed)
+    return {"updated": updated, "removed": removed}
+
+# === Property Filters ===
+# Conditions and parsers live in feeds.PROPERTY_FILTERS
+def parse_property_filters(args):
+    """
+    Normalized filter set for cache keys: sorted (name, value) pairs, blanks dropped,
+    so equivalent requests share one cache entry. Raises ValueError on a bad number.
+    """
+    filters = []
+    for name, (_, parse) in PROPERTY_FILTERS.items():
+        value = args.get(name, "").strip()
+        if value:
+            filters.append((name, parse(value)))
+    return tuple(sorted(filters))
+
+# === Fetch Function ===
+def fetch_properties_page(feed, page, per_page, after_ref=None, filters=()):
+    """
+    One page of a feed ordered by ref DESC, optionally filtered (see PROPERTY_FILTERS).
+    With after_ref the page is found by seeking past that ref (cost independent of depth),
+    otherwise by OFFSET for older page-number clients.
+    """
     offset = (page - 1) * per_page
+    sql = FEEDS[feed].listing_sql([name for name, _ in filters], seek=after_ref is not None)
 
-    if feed == "resales":
-        table = "resales_properties"
-        image_table = "resales_property_images"
-        image_column = "image_url"
-        image_join_column = "p.ref"
-        image_compare_column = "CAST(i.property_id AS TEXT)"
-    elif feed == "kyero":
-        table = "kyero_properties"
-        image_table = "kyero_property_images"
-        image_column = "url"
-        image_join_column = "p.id"
-        image_compare_column = "i.property_id"
+    params = [value for _, value in filters]
+    if after_ref is not None:
+        params += [after_ref, per_page + 1, 0]
     else:
-        table = "propmls_properties"
-        image_table = "propmls_property_images"
-        image_column = "url"
-        image_join_column = "p.id"
-        image_compare_column = "i.property_id"
+        params += [per_page + 1, offset]
 
-    with get_db() as conn:
+    with get_db(readonly=True, min_lsn=feed_lsn(feed)) as conn:
         with conn.cursor() as cur:
-            cur.execute(f"""
-                SELECT p.ref, p.price, p.beds, p.baths, p.town, img.{image_column} AS cover_image
-                FROM {table} p
-                LEFT JOIN LATERAL (
-                    SELECT {image_column}
-                    FROM {image_table} i
-                    WHERE {image_compare_column} = {image_join_column}
-                    AND image_order = 1
-                    LIMIT 1
-                ) img ON true
-                ORDER BY p.ref DESC
-                LIMIT %s OFFSET %s
-            """, (per_page + 1, offset))
-
+            cur.execute(sql, params, prepare=True)
             rows = cur.fetchall()
             has_next = len(rows) > per_page
             return rows[:per_page], has_next
         
+# === Contact Totals ===
+# Exact COUNT(*) per role, cached so the pager doesn't count on every click
+CONTACT_COUNT_TTL = int(os.environ.get("CONTACT_COUNT_TTL", 300))
+_contact_counts = {}  # role ("" = all) -> (count, expires_at)
+_contact_counts_lock = threading.Lock()
+
+def count_contacts(role_filter):
+    key = role_filter or ""
+    now = time.monotonic()
+    with _contact_counts_lock:
+        cached = _contact_counts.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+
+    query = "SELECT COUNT(*) AS total FROM contacts"
+    params = ()
+    if role_filter:
+        query += " WHERE role = %s"
+        params = (role_filter,)
+
+    # primary: a lagging replica could re-cache a total from before a delete for CONTACT_COUNT_TTL
+    with get_db() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            total = cur.fetchone()["total"]
+
+    with _contact_counts_lock:
+        _contact_counts[key] = (total, now + CONTACT_COUNT_TTL)
+    return total
+
+def invalidate_contact_counts():
+    with _contact_counts_lock:
+        _contact_counts.clear()
+
 @app.route("/api/contacts")
 def get_contacts():
     try:
@@ -112,22 +423,44 @@ def get_contacts():
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 100))
         offset = (page - 1) * per_page
+        cursor = request.args.get("cursor")
+        with_total = request.args.get("with_total") in ("1", "true")
+        # fresh=1: the client just wrote (deleted a contact) and must not read a lagging replica
+        fresh = request.args.get("fresh") in ("1", "true")
+
+        try:
+            after_id = int(decode_cursor(cursor)) if cursor else None
+        except (ValueError, TypeError):
+            return jsonify(error="Invalid cursor"), 400
 
         query = "SELECT id, name, email, phone, mobile, role FROM contacts"
+        conditions = []
         params = []
 
         if role_filter:
-            query += " WHERE role = %s"
+            conditions.append("role = %s")
             params.append(role_filter)
 
+        # cursor (from next_cursor) seeks past the last seen id instead of OFFSET
+        if after_id is not None:
+            conditions.append("id < %s")
+            params.append(after_id)
+            offset = 0
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
         query += " ORDER BY id DESC LIMIT %s OFFSET %s"
-        params += [per_page, offset]
+        params += [per_page + 1, offset]
 
-        with get_db() as conn:
+        with get_db(readonly=not fresh) as conn:
             with conn.cursor() as cur:
                 cur.execute(query, tuple(params))
                 rows = cur.fetchall()
 
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+
         contacts = [{
             "id": r["id"],
             "name": r["name"],
@@ -137,8 +470,18 @@ def get_contacts():
             "roles": [r["role"]] if r["role"] else []
         } for r in rows]
 
-        return jsonify(contacts=contacts)
+        result = {
+            "contacts": contacts,
+            "has_next": has_next,
+            "next_cursor": encode_cursor(rows[-1]["id"]) if has_next and rows else None
+        }
+        if with_total:
+            result["total"] = count_contacts(role_filter)
+
+        return jsonify(result)
 
+    except (PoolTimeout, TooManyRequests):
+        raise  # pool_busy -> 503 with Retry-After
     except Exception as e:
         return jsonify(error=str(e)), 500
 
@@ -150,983 +493,653 @@ def delete_contact(contact_id):
             with conn.cursor() as cur:
                 cur.execute("DELETE FROM contacts WHERE id = %s", (contact_id,))
                 conn.commit()
+        invalidate_contact_counts()
         return jsonify(success=True)
+    except (PoolTimeout, TooManyRequests):
+        raise  # pool_busy -> 503 with Retry-After
     except Exception as e:
         return jsonify(success=False, error=str(e)), 500
         
-@app.route("/api/search")
+# === Cross-Feed Reference Search ===
+# SEARCH_SQL / BULK_SEARCH_SQL: one statement over every feed, generated in feeds.py
+BULK_SEARCH_MAX_REFS = int(os.environ.get("BULK_SEARCH_MAX_REFS", 100))
+
+# Bursts of identical lookups (several agents opening the same listing) share one query
+search_flight = SingleFlight("search")
+
+# Results per ref, including empty ones so refs that exist nowhere don't query every feed each time.
+# Keys carry every feed's version: an import in any feed can add, change or remove a match.
+search_cache = TTLCache(
+    "search",
+    max_bytes=int(os.environ.get("SEARCH_CACHE_MAX_BYTES", 8 * 1024 * 1024)),
+    default_ttl=int(os.environ.get("SEARCH_CACHE_TTL", 300)),
+    ttls={"negative": int(os.environ.get("SEARCH_NEGATIVE_CACHE_TTL", 60))},
+)
+
+def search_cache_key(ref):
+    return (ref.lower(), tuple(feed_version(feed) for feed in PROPERTY_FEEDS))
+
+def cache_search_results(key, results):
+    search_cache.set(key, results, namespace=None if results else "negative")
+
+def run_search(ref):
+    with get_db(readonly=True, min_lsn=feed_lsn()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SEARCH_SQL, {"ref": ref}, prepare=True)
+            return cur.fetchall()
+
+def search_result(row):
+    return {
+        "feed": row["feed"],
+        "property": {
+            "ref": row["ref"],
+            "price": row["price"],
+            "beds": row["beds"],
+            "baths": row["baths"],
+            "town": row["town"],
+            "cover_image": row["cover_image"]
+        }
+    }
+
+def bulk_search_refs():
+    """
+    Refs from ?refs=a,b,c or a JSON body ({"refs": [...]} or a plain list), de-duplicated
+    case-insensitively. Commas, semicolons and whitespace all separate pasted refs.
+    """
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        refs = body.get("refs") if isinstance(body, dict) else body
+        if isinstance(refs, str):
+            refs = re.split(r"[\s,;]+", refs)
+    else:
+        refs = re.split(r"[\s,;]+", request.args.get("refs", ""))
+    if not isinstance(refs, list):
+        return []
+
+    unique = {}
+    for ref in refs:
+        ref = str(ref).strip()
+        if ref:
+            unique.setdefault(ref.lower(), ref)
+    return list(unique.values())
+
+def run_bulk_search(refs):
+    with get_db(readonly=True, min_lsn=feed_lsn()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(BULK_SEARCH_SQL, {"refs": [ref.lower() for ref in refs]}, prepare=True)
+            return cur.fetchall()
+
+@app.route("/api/search", methods=["GET", "POST"])
 def search_across_feeds():
+    if request.method == "POST" or "refs" in request.args:
+        return bulk_search()
+
     ref = request.args.get("ref")
     if not ref:
         return jsonify([])
 
-    # feed: (property_table, image_table, image_column, image_join_column, image_compare_column)
-    feeds = {
-        "resales": ("resales_properties", "resales_property_images", "image_url", "p.ref", "CAST(i.property_id AS TEXT)"),
-        "kyero": ("kyero_properties", "kyero_property_images", "url", "p.id", "i.property_id"),
-        "propmls": ("propmls_properties", "propmls_property_images", "url", "p.id", "i.property_id")
-    }
+    key = search_cache_key(ref)
+    results = search_cache.get(key)
+    if results is not MISS:
+        return jsonify(results)
 
-    results = []
+    def load():
+        cached = search_cache.get(key)
+        if cached is not MISS:
+            return cached
+        results = [search_result(row) for row in run_search(ref)]
+        cache_search_results(key, results)
+        return results
 
     try:
-        with get_db() as conn:
-            with conn.cursor() as cur:
-                for feed, (prop_table, img_table, img_col, join_left, join_right) in feeds.items():
-                    print(f"🔍 Searching {feed} for ref {ref}...")
-
-                    cur.execute(f"""
-                        SELECT p.ref, p.price, p.beds, p.baths, p.town,
-                               img.{img_col} AS cover_image
-                        FROM {prop_table} p
-                        LEFT JOIN LATERAL (
-                            SELECT {img_col}
-                            FROM {img_table} i
-                            WHERE {join_right} = {join_left}
-                              AND image_order = 1
-                            LIMIT 1
-                        ) img ON true
-                        WHERE LOWER(p.ref) = LOWER(%s)
-                        LIMIT 1
-                    """, (ref,))
-
-                    row = cur.fetchone()
-                    print(f"➡️ Result from {feed}:", row)
-
-                    if row:
-                        results.append({
-                            "feed": feed,
-                            "property": {
-                                "ref": row["ref"],
-                                "price": row["price"],
-                                "beds": row["beds"],
-                                "baths": row["baths"],
-                                "town": row["town"],
-                                "cover_image": row["cover_image"]
-                            }
-                        })
+        results = search_flight.do(key, load)
 
+    except (PoolTimeout, TooManyRequests):
+        raise  # pool_busy -> 503 with Retry-After
     except Exception as e:
-        print("❌ Search error:", str(e))
+        logger.exception("Search failed for ref %s", ref)
         return jsonify({"error": "Search failed", "details": str(e)}), 500
 
+    logger.debug("Search for ref %s matched feeds: %s", ref, [r["feed"] for r in results])
+
     return jsonify(results)
 
+def bulk_search():
+    """Matches keyed by the refs as given (each a list like the single search), plus the misses."""
+    refs = bulk_search_refs()
+    if not refs:
+        return jsonify(error="No refs given"), 400
+    if len(refs) > BULK_SEARCH_MAX_REFS:
+        return jsonify(error=f"At most {BULK_SEARCH_MAX_REFS} refs per request"), 400
+
+    keys = {ref: search_cache_key(ref) for ref in refs}
+    results = {ref: search_cache.get(keys[ref]) for ref in refs}
+    uncached = [ref for ref in refs if results[ref] is MISS]
+
+    if uncached:
+        try:
+            rows = run_bulk_search(uncached)
+        except (PoolTimeout, TooManyRequests):
+            raise  # pool_busy -> 503 with Retry-After
+        except Exception as e:
+            logger.exception("Bulk search failed for %d refs", len(uncached))
+            return jsonify({"error": "Search failed", "details": str(e)}), 500
+
+        matches = {}
+        for row in rows:
+            matches.setdefault(row["ref_key"], []).append(search_result(row))
+        for ref in uncached:
+            results[ref] = matches.get(ref.lower(), [])
+            cache_search_results(keys[ref], results[ref])
+
+    return jsonify(
+        results={ref: results[ref] for ref in refs if results[ref]},
+        missing=[ref for ref in refs if not results[ref]]
+    )
+
+# === Reference Typeahead ===
+# Prefix matches come first (LOWER(ref) COLLATE "C" btree index, read in order), then refs containing the
+# text anywhere (trigram index, only used from SUGGEST_MIN_CONTAINS characters on)
+SUGGEST_MIN_CHARS = 2
+SUGGEST_MIN_CONTAINS = 3
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 25
+SUGGEST_CANDIDATES = 5  # prefix rows per feed and requested suggestion, ranked shortest first
+
+suggest_cache = TTLCache(
+    "suggest",
+    max_bytes=int(os.environ.get("SUGGEST_CACHE_MAX_BYTES", 4 * 1024 * 1024)),
+    default_ttl=int(os.environ.get("SUGGEST_CACHE_TTL", 60)),
+)
+
+# SUGGEST_SQL / SUGGEST_PREFIX_SQL are generated in feeds.py
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@app.route("/api/search/suggest")
+def suggest_refs():
+    q = (request.args.get("q") or "").strip().lower()
+    limit = min(max(int(request.args.get("limit", SUGGEST_DEFAULT_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    if len(q) < SUGGEST_MIN_CHARS:
+        return jsonify(suggestions=[])
+
+    key = (q, limit)
+    suggestions = suggest_cache.get(key)
+    if suggestions is MISS:
+        escaped = escape_like(q)
+        sql = SUGGEST_SQL if len(q) >= SUGGEST_MIN_CONTAINS else SUGGEST_PREFIX_SQL
+        try:
+            with get_db(readonly=True, min_lsn=feed_lsn()) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, {
+                        "prefix": escaped + "%", "contains": "%" + escaped + "%",
+                        "limit": limit, "candidates": limit * SUGGEST_CANDIDATES
+                    })
+                    suggestions = [{"feed": r["feed"], "ref": r["ref"]} for r in cur.fetchall()]
+        except (PoolTimeout, TooManyRequests):
+            raise  # pool_busy -> 503 with Retry-After
+        except Exception as e:
+            logger.exception("Suggest failed for %s", q)
+            return jsonify({"error": "Suggest failed", "details": str(e)}), 500
+        suggest_cache.set(key, suggestions)
+
+    return jsonify(suggestions=suggestions)
+
 # === API Endpoint ===
+# Part of every property page ETag, so a deploy never answers 304 to a body cached by the previous one:
+# bump PROPERTY_PAYLOAD_VERSION when the JSON shape changes; Render also sets RENDER_GIT_COMMIT per deploy
+PROPERTY_PAYLOAD_VERSION = 3  # 2: next_cursor, 3: covers from *_cover_images
+PROPERTY_PAGE_BUILD = (PROPERTY_PAYLOAD_VERSION, os.environ.get("RENDER_GIT_COMMIT", ""))
+
 @app.route('/api/properties')
 def get_properties():
     feed = request.args.get('feed', 'resales')
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 18))
+    page = max(int(request.args.get('page', 1)), 1)
+    per_page = min(max(int(request.args.get('per_page', 18)), 1), MAX_PER_PAGE)
+    cursor = request.args.get('cursor')
+
+    # unknown feeds have always been served from propmls
+    if feed not in PROPERTY_FEEDS:
+        feed = "propmls"
+
+    # cursor (from next_cursor) takes precedence over page
+    try:
+        after_ref = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify(error="Invalid cursor"), 400
+    # property cursors are always a ref string (see next_cursor below)
+    if after_ref is not None and not isinstance(after_ref, str):
+        return jsonify(error="Invalid cursor"), 400
+    if after_ref is not None:
+        page = 1  # ignored when seeking; keeps cache keys of cursor pages stable
+
+    try:
+        filters = parse_property_filters(request.args)
+    except ValueError:
+        return jsonify(error="Invalid filter, min_price/max_price/min_beds/min_baths must be whole numbers"), 400
+
+    key = (feed, page, per_page, after_ref, filters, feed_version(feed))
+    # Same key and build -> same page until the feed's version is bumped, so the browser can revalidate
+    etag = hashlib.sha1(repr((PROPERTY_PAGE_BUILD, key)).encode("utf-8")).hexdigest()[:20]
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        properties, has_next = get_properties_cached(*key)
+        schedule_prefetch(key, properties, has_next)
+        next_cursor = encode_cursor(properties[-1]["ref"]) if has_next and properties else None
+        response = jsonify({
+            "properties": properties,
+            "has_next": has_next,
+            "next_cursor": next_cursor
+        })
+
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# === Property Detail & Galleries ===
+GALLERY_MAX_REFS = 100
+
+@app.route("/api/properties/<feed>/<ref>")
+def get_property_detail(feed, ref):
+    if feed not in PROPERTY_FEEDS:
+        return jsonify(error=f"Unknown feed, expected one of {', '.join(PROPERTY_FEEDS)}"), 400
+
+    with get_db(readonly=True, min_lsn=feed_lsn(feed)) as conn:
+        with conn.cursor() as cur:
+            cur.execute(FEEDS[feed].detail_sql, (ref,))
+            row = cur.fetchone()
+
+    if row is None:
+        return jsonify(error="Property not found"), 404
+    return jsonify(feed=feed, property=row)
+
+@app.route("/api/properties/galleries")
+def get_property_galleries():
+    """Ordered image lists for many refs of one feed (refs=a,b,c) in a single query."""
+    feed = request.args.get("feed")
+    if feed not in PROPERTY_FEEDS:
+        return jsonify(error=f"Unknown feed, expected one of {', '.join(PROPERTY_FEEDS)}"), 400
+
+    refs = list(dict.fromkeys(r.strip() for r in request.args.get("refs", "").split(",") if r.strip()))
+    if not refs:
+        return jsonify(error="Missing refs"), 400
+    if len(refs) > GALLERY_MAX_REFS:
+        return jsonify(error=f"At most {GALLERY_MAX_REFS} refs per request"), 400
+
+    with get_db(readonly=True, min_lsn=feed_lsn(feed)) as conn:
+        with conn.cursor() as cur:
+            cur.execute(FEEDS[feed].galleries_sql, (refs,), prepare=True)
+            galleries = {row["ref"]: row["images"] for row in cur.fetchall()}
+
+    return jsonify(
+        feed=feed,
+        galleries=galleries,
+        missing=[ref for ref in refs if ref not in galleries]
+    )
+
+# === Bulk Export ===
+# Rows stream from a server-side (named) cursor in EXPORT_BATCH_SIZE batches, so memory stays
+# flat however big the table is. The pooled connection is held until the download finishes.
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 2000))
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CONTACT_EXPORT_COLUMNS = ("id", "name", "email", "phone", "mobile", "role")
+PROPERTY_EXPORT_COLUMNS = ("ref", "price", "beds", "baths", "town", "cover_image")
+
+def stream_export(name, query, params, columns, fmt, min_lsn=None):
+    start = time.perf_counter()
+    exported = 0
+    with get_db(readonly=True, min_lsn=min_lsn) as conn:
+        with conn.cursor(name=f"export_{name}") as cur:
+            cur.itersize = EXPORT_BATCH_SIZE
+            cur.execute(query, params)
+
+            if fmt == "csv":
+                yield ",".join(columns) + "\r\n"
+            while True:
+                rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                exported += len(rows)
+                if fmt == "csv":
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows([row[c] for c in columns] for row in rows)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(json.dumps(row, default=str, ensure_ascii=False) + "\n" for row in rows)
+
+    logger.info("Exported %d %s rows in %.2fs", exported, name, time.perf_counter() - start)
+
+def export_response(name, query, params, columns, min_lsn=None):
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error=f"Unknown format, expected one of {', '.join(EXPORT_FORMATS)}"), 400
+
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(
+        stream_export(name, query, params, columns, fmt, min_lsn),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.route("/api/export/contacts")
+def export_contacts():
+    auth_result = require_auth()
+    if auth_result:
+        return auth_result
 
-    properties, has_next = get_properties_cached(feed, page, per_page)
-    return jsonify({
-        "properties": properties,
-        "has_next": has_next
-    })
+    query = f"SELECT {', '.join(CONTACT_EXPORT_COLUMNS)} FROM contacts"
+    params = []
+    role_filter = request.args.get("role")
+    if role_filter:
+        query += " WHERE role = %s"
+        params.append(role_filter)
+    return export_response("contacts", query + " ORDER BY id", params, CONTACT_EXPORT_COLUMNS)
+
+@app.route("/api/export/properties")
+def export_properties():
+    auth_result = require_auth()
+    if auth_result:
+        return auth_result
+
+    feed = request.args.get("feed")
+    if feed not in PROPERTY_FEEDS:
+        return jsonify(error=f"Unknown feed, expected one of {', '.join(PROPERTY_FEEDS)}"), 400
+    try:
+        filters = parse_property_filters(request.args)
+    except ValueError:
+        return jsonify(error="Invalid filter, min_price/max_price/min_beds/min_baths must be whole numbers"), 400
+
+    query = FEEDS[feed].export_sql([name for name, _ in filters])
+    return export_response(f"{feed}_properties", query, [value for _, value in filters], PROPERTY_EXPORT_COLUMNS,
+                           min_lsn=feed_lsn(feed))
+
+# === Cache Admin (feed import jobs) ===
+# Import jobs POST here once a feed is loaded: cover images are synced, then cached pages dropped
+@app.route("/api/cache/invalidate", methods=["POST"])
+def invalidate_cache():
+    auth_result = require_auth()
+    if auth_result:
+        return auth_result
+
+    feed = request.args.get("feed")
+    if feed not in PROPERTY_FEEDS:
+        return jsonify(error=f"Unknown feed, expected one of {', '.join(PROPERTY_FEEDS)}"), 400
+
+    covers = refresh_cover_images(feed)
+    return jsonify(feed=feed, covers=covers, invalidated=invalidate_feed(feed))
+
+CACHES = {"properties": property_cache, "suggest": suggest_cache, "search": search_cache}
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    stats["warmup"] = warmup_status
+    return jsonify(stats)
+
+@registry.collector
+def singleflight_metrics():
+    flights = (property_flight, search_flight)
+    yield "singleflight_calls_total", "counter", "Queries actually run (flight leaders)", ("flight",), [
+        ((f.name,), f.stats()["calls"]) for f in flights]
+    yield "singleflight_coalesced_total", "counter", "Requests served by another request's in-flight query", ("flight",), [
+        ((f.name,), f.stats()["coalesced"]) for f in flights]
+
+@registry.collector
+def cache_metrics():
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    for key, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                      ("entries", "gauge"), ("bytes", "gauge"), ("hit_ratio", "gauge")):
+        suffix = "_total" if kind == "counter" else ""
+        yield f"cache_{key}{suffix}", kind, f"Result cache {key}", ("cache",), [
+            ((name,), s[key]) for name, s in stats.items()]
 
 # === 📈 API for Inquiry Stats ===
+INQUIRY_STATS_FILE = "inquiry_stats.json"
+BUYERS_FILE = "buyers_with_suggestions_and_notes_with_nationalities.json"
+
+# === Buyer Chart Series ===
+# Mirrors the dashboard's old client-side aggregation (aggregateBuyers/bucketIndex/toMonthKey)
+PRICE_BUCKETS = [
+    (0, 150000), (150000, 300000), (300000, 500000),
+    (500000, 750000), (750000, 1000000), (1000000, 1500000), (1500000, float("inf"))
+]
+PRICE_BUCKET_LABELS = ["0–150k", "150–300k", "300–500k", "500–750k", "750k–1M", "1M–1.5M", "1.5M+"]
+TOP_NATIONALITIES = 12            # Inquiries by Nationality (+ "Others")
+TOP_BUDGET_NATIONALITIES = 10     # Budget by Nationality
+
+def to_month_key(ts):
+    try:
+        d = datetime.fromisoformat(str(ts).replace(" ", "T"))
+    except ValueError:
+        return None
+    return f"{d.year}-{d.month:02d}"
+
+def bucket_index(price):
+    try:
+        p = float(price or 0)
+    except (TypeError, ValueError):
+        return len(PRICE_BUCKETS) - 1
+    for i, (lo, hi) in enumerate(PRICE_BUCKETS):
+        if lo <= p < hi:
+            return i
+    return len(PRICE_BUCKETS) - 1
+
+def _nationality_series(cube):
+    """cube: nationality -> bucket counts, in order of first appearance (ties keep that order)."""
+    totals = sorted(((nat, sum(buckets)) for nat, buckets in cube.items()), key=lambda e: -e[1])
+
+    nationality = [list(e) for e in totals[:TOP_NATIONALITIES]]
+    others = sum(count for _, count in totals[TOP_NATIONALITIES:])
+    if others > 0:
+        nationality.append(["Others", others])
+
+    top = [nat for nat, _ in totals[:TOP_BUDGET_NATIONALITIES]]
+    return {
+        "nationality": nationality,
+        "budget_by_nationality": {
+            "nationalities": top,
+            "counts": [[cube[nat][i] for nat in top] for i in range(len(PRICE_BUCKETS))]  # [bucket][nat]
+        }
+    }
+
+def aggregate_buyer_series(inquiry_data, buyers_data):
+    """
+    Month x nationality x price-bucket counts, reduced to the series the three buyer charts draw:
+    per month and for the whole period (ytd).
+    """
+    months = sorted(k for k in inquiry_data if re.fullmatch(r"\d{4}-\d{2}", k))
+    rows = buyers_data.get("data", []) if isinstance(buyers_data, dict) else []
+
+    cube = {m: {} for m in months}   # month -> nationality -> bucket counts
+    ytd = {}
+    for r in rows:
+        mk = to_month_key(r.get("inquiry_date"))
+        if mk not in cube:
+            continue
+        nat = r.get("nationality") or "Unknown"
+        b = bucket_index(r.get("max_price"))
+        cube[mk].setdefault(nat, [0] * len(PRICE_BUCKETS))[b] += 1
+        ytd.setdefault(nat, [0] * len(PRICE_BUCKETS))[b] += 1
+
+    monthly = {}
+    for m in months:
+        series = _nationality_series(cube[m])
+        series["budget"] = [sum(buckets[i] for buckets in cube[m].values()) for i in range(len(PRICE_BUCKETS))]
+        monthly[m] = series
+
+    ytd_series = _nationality_series(ytd)
+    ytd_series["budget_by_month"] = [[monthly[m]["budget"][i] for m in months] for i in range(len(PRICE_BUCKETS))]  # [bucket][month]
+
+    return {
+        "months": months,
+        "price_buckets": PRICE_BUCKET_LABELS,
+        "total_buyers": len(rows),
+        "monthly": monthly,
+        "ytd": ytd_series
+    }
+
+# === Prebuilt Inquiry Payloads ===
+# Kept as ready-to-send bytes, rebuilt when either file's mtime changes:
+#   full         -> /api/inquiries (stats + raw buyers)
+#   stats        -> /api/inquiries?buyers=0
+#   buyer_series -> /api/inquiries/buyers
+_inquiries_payload = None
+_inquiries_lock = threading.Lock()
+
+def prebuild(body):
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=6, mtime=0),
+        "etag": hashlib.sha1(body).hexdigest(),
+    }
+
+def prebuild_json(obj):
+    return prebuild(json.dumps(obj).encode("utf-8"))
+
+def build_inquiries_payload():
+    with open(INQUIRY_STATS_FILE, "r", encoding="utf-8") as f:
+        inquiry_data = json.load(f)
+
+    with open(BUYERS_FILE, "r", encoding="utf-8") as f:
+        buyers_data = json.load(f)
+
+    stats = prebuild_json(inquiry_data)
+    buyer_series = prebuild_json(aggregate_buyer_series(inquiry_data, buyers_data))
+
+    # Merge buyers_data into inquiry_data under a new key
+    inquiry_data["buyers"] = buyers_data
+
+    return {"full": prebuild_json(inquiry_data), "stats": stats, "buyer_series": buyer_series}
+
+def get_inquiries_payload():
+    global _inquiries_payload
+    mtimes = (os.stat(INQUIRY_STATS_FILE).st_mtime_ns, os.stat(BUYERS_FILE).st_mtime_ns)
+
+    payload = _inquiries_payload
+    if payload is not None and payload["mtimes"] == mtimes:
+        return payload
+
+    with _inquiries_lock:
+        if _inquiries_payload is None or _inquiries_payload["mtimes"] != mtimes:
+            payload = build_inquiries_payload()
+            payload["mtimes"] = mtimes
+            _inquiries_payload = payload
+            logger.info("Rebuilt inquiries payload (%d bytes, %d gzipped)", len(payload["full"]["body"]), len(payload["full"]["gzip"]))
+        return _inquiries_payload
+
+def send_prebuilt(prebuilt, mimetype="application/json"):
+    # Weak ETag: the gzip and identity bodies are the same representation
+    if request.if_none_match.contains_weak(prebuilt["etag"]):
+        response = app.response_class(status=304)
+    elif request.accept_encodings["gzip"] > 0:
+        response = app.response_class(prebuilt["gzip"], mimetype=mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = app.response_class(prebuilt["body"], mimetype=mimetype)
+
+    response.set_etag(prebuilt["etag"], weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
 @app.route("/api/inquiries")
 def get_inquiries():
     try:
-        with open("inquiry_stats.json", "r", encoding="utf-8") as f:
-            inquiry_data = json.load(f)
-        
-        with open("buyers_with_suggestions_and_notes_with_nationalities.json", "r", encoding="utf-8") as f:
-            buyers_data = json.load(f)
-        
-        # Merge buyers_data into inquiry_data under a new key
-        inquiry_data["buyers"] = buyers_data
+        payload = get_inquiries_payload()
+    except FileNotFoundError as e:
+        return jsonify(error=f"{e.filename} not found"), 404
+
+    return send_prebuilt(payload["stats"] if request.args.get("buyers") == "0" else payload["full"])
 
-        return app.response_class(json.dumps(inquiry_data), mimetype="application/json")
-    
+@app.route("/api/inquiries/buyers")
+def get_buyer_series():
+    try:
+        payload = get_inquiries_payload()
     except FileNotFoundError as e:
         return jsonify(error=f"{e.filename} not found"), 404
 
+    return send_prebuilt(payload["buyer_series"])
+
 # === 📊 Dashboard HTML Page ===
+# Rendered once per process; its CSS/JS are separate fingerprinted files (see serve_static)
+_dashboard_page = None
+
+def get_dashboard_page():
+    global _dashboard_page
+    if _dashboard_page is None:
+        html = render_template(
+            "inquiries_dashboard.html",
+            css_url=asset_url("inquiries.css"),
+            js_url=asset_url("inquiries.js")
+        )
+        _dashboard_page = prebuild(html.encode("utf-8"))
+    return _dashboard_page
+
 @app.route("/dashboard/inquiries")
 def inquiries_dashboard():
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-      <meta charset="UTF-8" />
-      <meta name="viewport" content="width=device-width, initial-scale=1.0"/>
-      <title>AbraCasaBra Real Estate</title>
-<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-<script src="https://cdn.jsdelivr.net/npm/chartjs-plugin-datalabels@2"></script>
-<script>
-  // Register the plugin with Chart.js
-  Chart.register(ChartDataLabels);
-</script>
-      <style>
-        body {
-          font-family: 'Inter', sans-serif;
-          background: #f8fafc;
-          padding: 2rem;
-        }
-        h2 {
-          text-align: center;
-        }
-table, th, td {
-  border: 1px solid #ccc;
-  padding: 6px 12px;
-}
-thead {
-  background: #f1f5f9;
-}
-
-.top-properties-table {
-  border-collapse: collapse;
-  width: 100%;
-  font-size: 14px;
-  box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-  background: #fff;
-}
-
-.top-properties-table th, .top-properties-table td {
-  border: 1px solid #ddd;
-  padding: 8px 12px;
-  text-align: left;
-}
-
-.top-properties-table th {
-  background-color: #f4f4f4;
-  font-weight: bold;
-}
-
-.top-properties-table tr:nth-child(even) {
-  background-color: #fafafa;
-}
-
-
-
-#priceNationalityChart {
-  max-height: 90vh !important; /* taller */
-  aspect-ratio: auto;          /* let height expand */
-}
-
-.top-properties-table a {
-  color: #2563EB;
-  text-decoration: none;
-  font-weight: 500;
-}
-.top-properties-table a:hover {
-  text-decoration: underline;
-}
-
-canvas {
-  width: 100%;
-  max-width: 1400px;
-max-height: 60vh;
-  height: auto;
-  aspect-ratio: 3 / 1; /* Keep it wide and short */
-  display: block;
-  margin: 2rem auto;
-}
-      </style>
-    </head>
-    <body>
-      <h2>AbraCasaBra Real Estate Statistics (Since January 2025)</h2>
-    <h3 style="text-align:center; margin-top:3rem;"> Auto import Inquiries & Wishlists</h3>
-      <canvas id="inquiryChart"></canvas>
-      <h3 style="text-align:center; margin-top:3rem;"> Monthly Inquiry Breakdown Per Portal</h3>
-<canvas id="sourceBreakdownChart"></canvas>
-
-<!-- === Buyers Budget & Nationality (New) === -->
-<h3 style="text-align:center; margin-top:3rem;">Buyer Budget & Nationality (Monthly / Since January 2025)</h3>
-
-
-<!-- Chart 1: Budget distribution over time -->
-<h4 style="text-align:center;margin-top:1rem;">Budget Distribution (Stacked by Price Range)</h4>
-<!-- 🔹 Controls for Chart 1 -->
-<div id="controlsBudgetOverTime" style="max-width:1400px;margin:1rem auto;display:flex;gap:.75rem;flex-wrap:wrap;align-items:center;justify-content:center">
-  <label><input type="radio" name="modeBudgetOverTime" value="monthly" checked> Monthly</label>
-  <label><input type="radio" name="modeBudgetOverTime" value="ytd"> Since January 2025</label>
-  <select id="monthBudgetOverTime" style="padding:.4rem .6rem;border:1px solid #ddd;border-radius:.4rem"></select>
-</div>
-<canvas id="buyersBudgetOverTimeChart"></canvas>
-
-<!-- Chart 2: Inquiries by Nationality (count) -->
-<h4 style="text-align:center;margin-top:2rem;">Inquiries by Nationality</h4>
-<!-- 🔹 Controls for Chart 2 -->
-<div id="controlsNationality" style="max-width:1400px;margin:1rem auto;display:flex;gap:.75rem;flex-wrap:wrap;align-items:center;justify-content:center">
-  <label><input type="radio" name="modeNationality" value="monthly" checked> Monthly</label>
-  <label><input type="radio" name="modeNationality" value="ytd"> Since January 2025</label>
-  <select id="monthNationality" style="padding:.4rem .6rem;border:1px solid #ddd;border-radius:.4rem"></select>
-</div>
-<canvas id="buyersNationalityChart"></canvas>
-
-<!-- Chart 3: Budget by Nationality (who has what budget) -->
-<h4 style="text-align:center;margin-top:2rem;">Budget by Nationality (Stacked by Price Range)</h4>
-<!-- 🔹 Controls for Chart 3 -->
-<div id="controlsBudgetByNationality" style="max-width:1400px;margin:1rem auto;display:flex;gap:.75rem;flex-wrap:wrap;align-items:center;justify-content:center">
-  <label><input type="radio" name="modeBudgetByNationality" value="monthly" checked> Monthly</label>
-  <label><input type="radio" name="modeBudgetByNationality" value="ytd"> Since January 2025</label>
-  <select id="monthBudgetByNationality" style="padding:.4rem .6rem;border:1px solid #ddd;border-radius:.4rem"></select>
-</div>
-<canvas id="buyersBudgetByNationalityChart"></canvas>
-
-
-    <h3 style="text-align:center; margin-top:3rem;"> Monthly Property Views Website</h3>
-    <canvas id="viewsChart"></canvas>
-<h3 style="text-align:center; margin-top:3rem;">Most Viewed Locations Of All Time (Property Pages)</h3>
-<canvas id="locationsChart"></canvas>
-
-<h3 style="text-align:center; margin-top:3rem;">Top Viewer Countries</h3>
-<canvas id="countriesChart"></canvas>
-
-<h3 style="text-align:center; margin-top:3rem;">Views by Price Range</h3>
-<canvas id="priceRangeChart"></canvas>
-
-<h3 style="text-align:center; margin-top:3rem;">Views by Price Range & Nationality</h3>
-<canvas id="priceNationalityChart"></canvas>
-
-<h3 style="text-align:center; margin-top:3rem;">Most Viewed Properties Of All Time</h3>
-<div id="topPropertiesContainer" style="overflow-x:auto; max-width:1400px; margin:2rem auto;"></div>
-
-
-
-<script>
-  fetch('/api/inquiries')
-    .then(res => {
-      if (!res.ok) throw new Error("API call failed");
-      return res.json();
-    })
-    .then(data => {
-function buildLastNMonths(n = 24) {
-  const out = [];
-  const now = new Date();
-  for (let i = n - 1; i >= 0; i--) {
-    const d = new Date(now.getFullYear(), now.getMonth() - i, 1);
-    out.push(`${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}`);
-  }
-  return out;
-}
-
-const months = Object.keys(data)
-  .filter(k => /^\d{4}-\d{2}$/.test(k))
-  .sort();
-
-      const autoimport = [];
-      const wishlist = [];
-      const bgAuto = [];
-      const bgWish = [];
-
-      // instead of building table HTML
-// Collect unique sources
-const sourceSet = new Set();
-months.forEach(month => {
-  if (data[month]) {
-    Object.keys(data[month].sources || {}).forEach(src => sourceSet.add(src));
-  }
-});
-const sources = Array.from(sourceSet);
-
-const datasets = [];
-
-// Add per-source stacks
-sources.forEach((src, i) => {
-  let color;
-  const cleanLabel = src.replace("Subject: ", "").toLowerCase();
-
-  if (cleanLabel.includes("pisos.com")) {
-    color = "rgba(255, 159, 64, 0.8)"; // orange for pisos.com
-  } else if (cleanLabel.includes("kyero")) {
-    color = "rgba(255, 99, 132, 0.8)"; // reddish for kyero
-  } else {
-    // fallback to auto HSL colors for other sources
-    color = `hsl(${(i * 60) % 360}, 60%, 60%)`;
-  }
-
-  datasets.push({
-    label: src.replace("Subject: ", ""),
-    data: months.map(m => data[m]?.sources?.[src] || 0),
-    backgroundColor: color,
-    stack: "sources"
-  });
-});
-
-// ====== Buyers charts (Budget & Nationality) ======
-const buyersBlock = data.buyers || data["buyers"] || null;
-const buyersRaw = buyersBlock && Array.isArray(buyersBlock.data) ? buyersBlock.data : [];
-
-
-// Build month list for current year (YYYY-MM)
-const monthKeys = months;
-
-
-
-
-
-
-// Helpers
-const PRICE_BUCKETS = [
-  [0,150000],[150000,300000],[300000,500000],
-  [500000,750000],[750000,1000000],[1000000,1500000],[1500000,Infinity]
-];
-const PRICE_BUCKET_LABELS = ["0–150k","150–300k","300–500k","500–750k","750k–1M","1M–1.5M","1.5M+"];
-
-function toMonthKey(ts){
-  // input like "2025-10-20 22:37:30"
-  const d = new Date(ts.replace(" ","T"));
-  if (isNaN(d.getTime())) return null;
-  return `${d.getFullYear()}-${String(d.getMonth()+1).padStart(2,"0")}`;
-}
-
-const monthSet = new Set(months);
-
-function inRange(rec) {
-  const mk = toMonthKey(rec.inquiry_date);
-  return mk && monthSet.has(mk);
-}
-
-function bucketIndex(price){
-  const p = Number(price||0);
-  for (let i=0;i<PRICE_BUCKETS.length;i++){
-    const [lo,hi] = PRICE_BUCKETS[i];
-    if (p>=lo && p<hi) return i;
-  }
-  return PRICE_BUCKETS.length-1;
-}
-
-function aggregateBuyers() {
-  // Filter to current year
- const rows = buyersRaw.filter(inRange);
-
-  // Monthly map: ym -> rows[]
-  const byMonth = new Map(monthKeys.map(m => [m, []]));
-  rows.forEach(r => {
-    const mk = toMonthKey(r.inquiry_date);
-    if (mk && byMonth.has(mk)) byMonth.get(mk).push(r);
-  });
-
-  // YTD = all rows in current year
-  const ytd = rows;
-
-  return { byMonth, ytd };
-}
-
-const buyersAgg = aggregateBuyers();
-
-// Chart instances (for clean re-render)
-let CHART_budgetOverTime = null;
-let CHART_nationality = null;
-let CHART_budgetByNationality = null;
-
-function destroyIfExists(ch){
-  if (ch && typeof ch.destroy === "function") ch.destroy();
-}
-
-// ===== Chart 1: Budget distribution over time =====
-// - Monthly: x = price buckets, values = counts for the selected month
-// - YTD:     x = months, stacked by price buckets (trend across the year)
-function renderBudgetOverTime(mode, monthKey){
-  const ctx = document.getElementById("buyersBudgetOverTimeChart");
-  destroyIfExists(CHART_budgetOverTime);
-
-  if (mode === "monthly") {
-    const rows = buyersAgg.byMonth.get(monthKey) || [];
-    const counts = Array(PRICE_BUCKETS.length).fill(0);
-    rows.forEach(r => counts[bucketIndex(r.max_price)]++);
-
-    CHART_budgetOverTime = new Chart(ctx, {
-      type: "bar",
-      data: {
-        labels: PRICE_BUCKET_LABELS,
-        datasets: [{ label: `Inquiries (${monthKey})`, data: counts, backgroundColor: "rgba(54,162,235,0.7)" }]
-      },
-      options: {
-        responsive:true, maintainAspectRatio:false,
-        plugins:{ legend:{display:false}, datalabels:{ display:false } },
-        scales:{ y:{ beginAtZero:true, ticks:{ stepSize:1 } } }
-      },
-      plugins:[ChartDataLabels]
-    });
-  } else {
-    // YTD stacked by buckets over months
-    const datasets = PRICE_BUCKET_LABELS.map((label,i) => ({
-      label,
-      data: monthKeys.map(m=>{
-        const rows = buyersAgg.byMonth.get(m) || [];
-        return rows.reduce((acc,r)=> acc + (bucketIndex(r.max_price)===i ? 1 : 0), 0);
-      }),
-      backgroundColor: `hsl(${(i*45)%360},60%,60%)`,
-      stack:"buckets"
-    }));
-
-    CHART_budgetOverTime = new Chart(ctx, {
-      type:"bar",
-      data:{ labels: monthKeys, datasets },
-      options:{
-        responsive:true, maintainAspectRatio:false,
-        plugins:{ legend:{ position:"top" }, datalabels:{ display:false } },
-        scales:{ x:{ stacked:true }, y:{ stacked:true, beginAtZero:true } }
-      },
-      plugins:[ChartDataLabels]
-    });
-  }
-}
-
-// ===== Chart 2: Inquiries by Nationality (counts) =====
-// - Monthly: counts per nationality for selected month
-// - YTD:     counts per nationality across current year
-function renderNationality(mode, monthKey){
-  const ctx = document.getElementById("buyersNationalityChart");
-  destroyIfExists(CHART_nationality);
-
-  const rows = (mode==="monthly") ? (buyersAgg.byMonth.get(monthKey) || []) : buyersAgg.ytd;
-  const countsByNat = {};
-  rows.forEach(r => {
-    const nat = r.nationality || "Unknown";
-    countsByNat[nat] = (countsByNat[nat]||0)+1;
-  });
-
-  // Top 12 nationalities + others
-  const entries = Object.entries(countsByNat).sort((a,b)=>b[1]-a[1]);
-  const main = entries.slice(0,12);
-  const others = entries.slice(12).reduce((acc, [,v])=>acc+v, 0);
-  if (others>0) main.push(["Others", others]);
-
-  CHART_nationality = new Chart(ctx, {
-    type:"bar",
-    data:{
-      labels: main.map(e=>e[0]),
-      datasets:[{ label:"Inquiries", data: main.map(e=>e[1]), backgroundColor:"rgba(75,192,192,0.7)" }]
-    },
-    options:{
-      responsive:true, maintainAspectRatio:false,
-      plugins:{ legend:{display:false}, datalabels:{ display:false } },
-      scales:{ y:{ beginAtZero:true, ticks:{ stepSize:1 } } }
-    },
-    plugins:[ChartDataLabels]
-  });
-}
-
-// ===== Chart 3: Budget by Nationality (stacked buckets) =====
-// - Monthly: for selected month
-// - YTD:     for current year
-function renderBudgetByNationality(mode, monthKey){
-  const ctx = document.getElementById("buyersBudgetByNationalityChart");
-  destroyIfExists(CHART_budgetByNationality);
-
-  const rows = (mode==="monthly") ? (buyersAgg.byMonth.get(monthKey) || []) : buyersAgg.ytd;
-
-  // Totals per nationality
-  const countsByNat = {};
-  rows.forEach(r=>{
-    const nat = r.nationality || "Unknown";
-    countsByNat[nat] = (countsByNat[nat]||0)+1;
-  });
-
-  // Top 10 nationalities by total
-  const topNats = Object.entries(countsByNat).sort((a,b)=>b[1]-a[1]).slice(0,10).map(e=>e[0]);
-
-  // Build matrix [nat][bucket] -> count
-  const matrix = {};
-  topNats.forEach(n => matrix[n] = Array(PRICE_BUCKETS.length).fill(0));
-  rows.forEach(r=>{
-    const nat = topNats.includes(r.nationality||"Unknown") ? (r.nationality||"Unknown") : null;
-    if (!nat) return; // skip non-top for readability
-    matrix[nat][bucketIndex(r.max_price)]++;
-  });
-
-  const datasets = PRICE_BUCKET_LABELS.map((label, i)=>({
-    label,
-    data: topNats.map(n => matrix[n][i]),
-    backgroundColor:`hsl(${(i*45)%360},60%,60%)`,
-    stack:"buckets"
-  }));
-
-  CHART_budgetByNationality = new Chart(ctx, {
-    type:"bar",
-    data:{ labels: topNats, datasets },
-    options:{
-      responsive:true, maintainAspectRatio:false,
-      plugins:{
-        legend:{ position:"top" },
-        tooltip:{
-          mode:"index", intersect:false,
-          callbacks:{ label: (ctx)=> `${ctx.dataset.label}: ${ctx.raw}` }
-        },
-        datalabels:{ display:false }
-      },
-      scales:{ x:{ stacked:true }, y:{ stacked:true, beginAtZero:true } }
-    },
-    plugins:[ChartDataLabels]
-  });
-}
-
-
-function setupIndependentControls(chartName, renderFn) {
-  const radios = document.querySelectorAll(`input[name="mode${chartName}"]`);
-  const select = document.getElementById(`month${chartName}`);
-
-  // populate month options
-select.innerHTML = monthKeys.map(m => {
-  const d = new Date(`${m}-01T00:00:00`);
-  return `<option value="${m}">
-    ${d.toLocaleString(undefined,{month:"long", year:"numeric"})}
-  </option>`;
-}).join("");
-
-  let mode = "monthly";
-  radios.forEach(r => {
-    r.addEventListener("change", e => {
-      mode = e.target.value;
-      select.disabled = (mode !== "monthly");
-      renderFn(mode, select.value);
-    });
-  });
-  select.addEventListener("change", () => renderFn(mode, select.value));
-  renderFn(mode, select.value); // initial render
-}
-
-if (buyersRaw.length) {
-  setupIndependentControls("BudgetOverTime", renderBudgetOverTime);
-  setupIndependentControls("Nationality", renderNationality);
-  setupIndependentControls("BudgetByNationality", renderBudgetByNationality);
-}
-
-
-      const topLocations = data["top_viewed_locations"] || [];
-      if (topLocations.length > 0) {
-        const locationLabels = topLocations.map(loc => loc.name);
-        const locationViews = topLocations.map(loc => loc.views);
-
-        new Chart(document.getElementById('locationsChart'), {
-          type: 'bar',
-          data: {
-            labels: locationLabels,
-            datasets: [{
-              label: 'Views per Location',
-              data: locationViews,
-              backgroundColor: 'rgba(153, 102, 255, 0.7)'
-            }]
-          },
-          options: {
-            responsive: true,
-            maintainAspectRatio: false,
-            plugins: {
-              legend: { display: false },
-              tooltip: {
-                callbacks: {
-                  label: ctx => `${ctx.raw} views`
-                }
-              },
-              datalabels: {
-                anchor: 'end',
-                align: 'end',
-                color: '#333',
-                font: { weight: 'bold' },
-                formatter: value => value > 0 ? value : ''
-              }
-            },
-            scales: {
-              y: { beginAtZero: true }
-            }
-          },
-          plugins: [ChartDataLabels]
-        });
-      }
-
-
-// === Price Range Views Chart ===
-const priceRangeData = data["views_by_price_range"] || {};
-if (Object.keys(priceRangeData).length > 0) {
-  // 🟢 Step 1: merge all ranges >= 1500000 into one
-  const mergedData = {};
-  let over1_5MTotal = 0;
-
-  Object.entries(priceRangeData).forEach(([range, count]) => {
-    let low = 0, high = 0;
-
-    if (range.includes("+")) {
-      low = parseInt(range);
-      high = Infinity;
-    } else {
-      [low, high] = range.split("-").map(n => parseInt(n));
-    }
-
-    if (low >= 1500000) {
-      over1_5MTotal += count;
-    } else {
-      mergedData[range] = (mergedData[range] || 0) + count;
-    }
-  });
-
-  if (over1_5MTotal > 0) {
-    mergedData["1500000+"] = over1_5MTotal;
-  }
-
-  // 🟢 Step 2: sort ranges
-  const labels = Object.keys(mergedData).sort((a, b) => {
-    if (a.includes("+")) return 1;
-    if (b.includes("+")) return -1;
-    const aLow = parseInt(a.split("-")[0]) || 0;
-    const bLow = parseInt(b.split("-")[0]) || 0;
-    return aLow - bLow;
-  });
-
-  const values = labels.map(l => mergedData[l]);
-
-  // 🟢 Step 3: build chart
-  new Chart(document.getElementById("priceRangeChart"), {
-    type: "bar",
-    data: {
-      labels: labels,
-      datasets: [{
-        label: "Total Views",
-        data: values,
-        backgroundColor: "rgba(255, 205, 86, 0.7)"
-      }]
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false,
-      plugins: {
-        legend: { display: false },
-        tooltip: {
-          callbacks: {
-            label: ctx => `${ctx.raw} views`
-          }
-        },
-        datalabels: {
-          anchor: "end",
-          align: "end",
-          color: "#333",
-          font: { weight: "bold" },
-          formatter: value => value > 0 ? value : ""
-        }
-      },
-      scales: {
-        x: {
-          ticks: {
-            callback: function(value, index) {
-              const range = labels[index];
-              if (range.includes("+")) return "1.5M+";
-              const [low, high] = range.split("-").map(n => parseInt(n));
-              return `${low/1000}k-${high/1000}k`;
-            }
-          }
-        },
-        y: { beginAtZero: true }
-      }
-    },
-    plugins: [ChartDataLabels]
-  });
-}
-
-const topCountries = data["top_viewer_countries"] || [];
-if (topCountries.length > 0) {
-  const countryLabels = topCountries.map(c => c.country);
-  const countryViews = topCountries.map(c => c.views);
-
-  new Chart(document.getElementById('countriesChart'), {
-    type: 'bar',
-    data: {
-      labels: countryLabels,
-      datasets: [{
-        label: 'Views by Country',
-        data: countryViews,
-        backgroundColor: 'rgba(75, 192, 192, 0.7)'
-      }]
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false,
-      plugins: {
-        legend: { display: false },
-        datalabels: {
-          anchor: 'end',
-          align: 'end',
-          color: '#333',
-          font: { weight: 'bold' },
-          formatter: value => value > 0 ? value : ''
-        }
-      },
-      scales: { y: { beginAtZero: true } }
-    },
-    plugins: [ChartDataLabels]
-  });
-}
-
-// === Views by Price Range & Nationality ===
-const priceNatData = data["views_by_price_and_nationality"] || {};
-if (Object.keys(priceNatData).length > 0) {
-  // 🟢 Step 1: normalize ranges → merge all >= 1500000 into one
-  const mergedData = {};
-
-  Object.entries(priceNatData).forEach(([country, ranges]) => {
-    mergedData[country] = {};
-    let over1_5MTotal = 0;
-
-    Object.entries(ranges).forEach(([range, count]) => {
-      let low = 0;
-      let high = 0;
-
-      if (range.includes("+")) {
-        low = parseInt(range); // e.g. "5000000+" → 5000000
-        high = Infinity;
-      } else {
-        [low, high] = range.split("-").map(n => parseInt(n));
-      }
-
-      if (low >= 1500000) {
-        over1_5MTotal += count;
-      } else {
-        mergedData[country][range] = (mergedData[country][range] || 0) + count;
-      }
-    });
-
-    if (over1_5MTotal > 0) {
-      mergedData[country]["1500000+"] = over1_5MTotal;
-    }
-  });
-
-  // 🟢 Step 2: collect all ranges again (after merge)
-  const allRanges = new Set();
-  Object.values(mergedData).forEach(ranges => {
-    Object.keys(ranges).forEach(r => allRanges.add(r));
-  });
-
-  // Sort ranges: numeric, with "1500000+" last
-  const priceRanges = Array.from(allRanges).sort((a, b) => {
-    if (a.includes("+")) return 1;
-    if (b.includes("+")) return -1;
-    const aLow = parseInt(a.split("-")[0]) || 0;
-    const bLow = parseInt(b.split("-")[0]) || 0;
-    return aLow - bLow;
-  });
-
-  // 🟢 Step 3: sort countries by total views
-  const countryTotals = {};
-  Object.entries(mergedData).forEach(([country, ranges]) => {
-    countryTotals[country] = Object.values(ranges).reduce((a, b) => a + b, 0);
-  });
-  const sortedCountries = Object.keys(countryTotals).sort(
-    (a, b) => countryTotals[b] - countryTotals[a]
-  );
-
-  // 🟢 Step 4: build datasets
-  const datasets = sortedCountries.map((country, idx) => ({
-    label: country,
-    data: priceRanges.map(r => mergedData[country]?.[r] || 0),
-    backgroundColor: `hsl(${(idx * 50) % 360}, 60%, 60%)`
-  }));
-
-  // 🟢 Step 5: draw chart
-  new Chart(document.getElementById("priceNationalityChart"), {
-    type: "bar",
-    data: { labels: priceRanges, datasets },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false,
-      plugins: {
-        tooltip: {
-          mode: "index",
-          intersect: false,
-          itemSort: (a, b) => b.raw - a.raw, // high → low
-          callbacks: {
-            label: ctx => `${ctx.dataset.label}: ${ctx.raw} views`
-          }
-        },
-        legend: { display: false },   // ❌ hide countries + colors
-        datalabels: { display: false }
-      },
-      scales: {
-        x: {
-          stacked: true,
-          ticks: {
-            callback: function(value, index) {
-              const range = this.getLabelForValue(value);
-              if (range.includes("+")) return "1.5M+";
-              const [low, high] = range.split("-").map(n => parseInt(n));
-              return `${low / 1000}k-${high / 1000}k`;
-            }
-          }
-        },
-        y: { stacked: true, beginAtZero: true }
-      }
-    },
-    plugins: [ChartDataLabels]
-  });
-}
-
-
-
-const topProperties = data["top_viewed_links"] || [];
-if (topProperties.length > 0) {
-  let html = "<table class='top-properties-table'>";
-  html += "<thead><tr><th>Rank</th><th>Reference</th><th>Views</th><th>Link</th></tr></thead><tbody>";
-  topProperties.forEach((p, idx) => {
-    html += `<tr>
-      <td>${idx + 1}</td>
-      <td>${p.ref}</td>
-      <td>${p.views}</td>
-      <td><a href="${p.link}" target="_blank">View</a></td>
-    </tr>`;
-  });
-  html += "</tbody></table>";
-  document.getElementById("topPropertiesContainer").innerHTML = html;
-}
-
-new Chart(document.getElementById("sourceBreakdownChart"), {
-  type: "bar",
-  data: { labels: months, datasets },
-  options: {
-    responsive: true,
-    maintainAspectRatio: false,
-    plugins: {
-      tooltip: { mode: "index", intersect: false },
-      legend: { position: "top" },
-      datalabels: {
-        color: "#333",
-        font: { weight: "bold" },
-        formatter: v => v > 0 ? v : ""
-      }
-    },
-    scales: {
-      x: { stacked: true },
-      y: { stacked: true, beginAtZero: true }
-    }
-  },
-  plugins: [ChartDataLabels]
-});
-
-
-      months.forEach(month => {
-        if (data[month]) {
-          autoimport.push(data[month].autoimport_total);
-          wishlist.push(data[month].wishlist_total);
-          bgAuto.push('rgba(54, 162, 235, 0.6)');
-          bgWish.push('rgba(255, 99, 132, 0.6)');
-        } else {
-          autoimport.push(0);
-          wishlist.push(0);
-          bgAuto.push('rgba(200, 200, 200, 0.3)');
-          bgWish.push('rgba(180, 180, 180, 0.3)');
-        }
-      });
-
-            // === 📈 Line Chart: Property Views ===
-      let lastDataIndex = months.findLastIndex(month => data[month]?.property_views > 0);
-
-// If no data, show nothing
-if (lastDataIndex === -1) lastDataIndex = 0;
-
-// Trim months and viewsData to only that range
-const trimmedMonths = months.slice(0, lastDataIndex + 1);
-const viewsData = trimmedMonths.map(month => data[month]?.property_views || 0);
-      const viewColors = viewsData.map(val => val > 0 ? 'rgba(34,197,94,0.5)' : 'rgba(180,180,180,0.3)');
-
-      new Chart(document.getElementById('viewsChart'), {
-  type: 'line',
-  data: {
-    labels: trimmedMonths,
-    datasets: [{
-      label: 'Property Views',
-      data: viewsData,
-      fill: false,
-      tension: 0.3,
-      borderColor: 'rgba(34,197,94,1)',
-      backgroundColor: 'rgba(34,197,94,0.5)',
-      pointRadius: 5,
-      pointHoverRadius: 7
-    }]
-        },
-        options: {
-          responsive: true,
-          maintainAspectRatio: false,
-          animation: { duration: 1000 },
-          plugins: {
-            legend: { display: false },
-            tooltip: {
-              callbacks: {
-                label: ctx => `Views: ${ctx.raw}`
-              }
-            },
-            datalabels: {
-              align: 'top',
-              anchor: 'end',
-              color: '#10b981',
-              font: { weight: 'bold' },
-              formatter: (value) => value > 0 ? value : ''
-            }
-          },
-scales: {
-  y: {
-    beginAtZero: true,
-    suggestedMax: Math.max(...viewsData) + 5000,
-    ticks: {
-      callback: (value) => value.toLocaleString()
-    }
-  }
-}
-        },
-        plugins: [ChartDataLabels]
-      });
-
-      new Chart(document.getElementById('inquiryChart'), {
-        type: 'bar',
-        data: {
-          labels: months,
-          datasets: [
-            {
-              label: 'Autoimport Contacts',
-              data: autoimport,
-              backgroundColor: bgAuto
-            },
-            {
-              label: 'Wishlist Only',
-              data: wishlist,
-              backgroundColor: bgWish
-            }
-          ]
-        },
-        options: {
-          responsive: true,
-          maintainAspectRatio: false,
-          animation: { duration: 1000 },
-          plugins: {
-            legend: { position: 'top' },
-            tooltip: {
-              callbacks: {
-                label: ctx => `${ctx.dataset.label}: ${ctx.raw}`
-              }
-            },
-            // 🔢 Add values on top of bars
-            datalabels: {
-              anchor: 'end',
-              align: 'end',
-              color: '#333',
-              font: { weight: 'bold' },
-              formatter: value => value > 0 ? value : ''
-            }
-          },
-          scales: {
-            y: {
-              beginAtZero: true,
-              ticks: { stepSize: 1 }
-            }
-          }
-        },
-        plugins: [ChartDataLabels] // 👈 Activate plugin for labels
-      });
-
-    })
-    .catch(err => {
-      alert("Failed to load data: " + err.message);
-    });
-
-    
-</script>
-    </body>
-    </html>
-    """
-    current_year = datetime.now().year
-    return render_template_string(html, year=current_year)
+    return send_prebuilt(get_dashboard_page(), mimetype="text/html")
+
+# === Startup Cache Warming ===
+# Fill the first pages of every feed and the dashboard payloads before serving traffic,
+# so the first users after a deploy don't all hit a cold cache
+WARMUP_PAGES = int(os.environ.get("WARMUP_PAGES", 3))  # per feed and page size, 0 disables
+# script.js asks for columns x 5 cards (getItemsPerPage): 3-6 columns on common desktop widths
+WARMUP_PER_PAGE = [int(n) for n in os.environ.get("WARMUP_PER_PAGE", "15,20,25,30").split(",") if n.strip()]
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", 4))
+
+warmup_status = {"state": "pending", "seconds": None, "pages": 0, "errors": 0}
+
+def _warm_feed(feed, per_page):
+    """Walk the first pages the way script.js does: page 1, then by cursor."""
+    key = (feed, 1, per_page, None, (), feed_version(feed))
+    for warmed in range(1, WARMUP_PAGES + 1):
+        properties, has_next = get_properties_cached(*key)
+        if not has_next or not properties:
+            return warmed
+        key = next_page_key(key, properties)
+    return WARMUP_PAGES
+
+def _warm_dashboard():
+    get_inquiries_payload()
+    with app.app_context():
+        get_dashboard_page()
+    return 0
+
+def warm_caches():
+    if WARMUP_PAGES <= 0:
+        warmup_status["state"] = "disabled"
+        return warmup_status
+
+    warmup_status["state"] = "running"
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WARMUP_CONCURRENCY, thread_name_prefix="cache-warmup") as executor:
+        tasks = {executor.submit(_warm_feed, feed, per_page): f"{feed}/{per_page}"
+                 for feed in PROPERTY_FEEDS for per_page in WARMUP_PER_PAGE}
+        tasks[executor.submit(_warm_dashboard)] = "inquiries"
+        for task, name in tasks.items():
+            try:
+                warmup_status["pages"] += task.result()
+            except Exception:
+                warmup_status["errors"] += 1
+                logger.warning("Cache warm-up of %s failed", name, exc_info=True)
+
+    warmup_status.update(state="done", seconds=round(time.perf_counter() - start, 3))
+    logger.info("Cache warm-up took %.2fs (%d property pages, %d errors)",
+                warmup_status["seconds"], warmup_status["pages"], warmup_status["errors"])
+    return warmup_status
+
+@registry.collector
+def warmup_metrics():
+    if warmup_status["seconds"] is not None:
+        yield "cache_warmup_seconds", "gauge", "Duration of the startup cache warm-up", (), [((), warmup_status["seconds"])]
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    debug = True
+    # with debug the app runs in a reloader child; only that process serves, so only it warms up
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_caches()
+    app.run(host="0.0.0.0", port=port, debug=debug)
@@ -0,0 +1,63 @@
+import os
+import json
+import hashlib
+
+
+ASSET_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Output of build_assets.py: hashed copies, their .gz/.br siblings, rewritten pages, manifest.json
+BUILD_DIR = os.path.join(ASSET_ROOT, "build")
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+
+# Fingerprinted URLs change whenever the content does, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_fingerprints = {}  # "inquiries.js" -> "inquiries.<hash>.js"
+_originals = {}     # "inquiries.<hash>.js" -> (directory, file to send)
+
+
+def hashed_name(relpath, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(relpath)
+    return f"{stem}.{digest}{ext}"
+
+
+def load_manifest():
+    """Use the build's hashed (and precompressed) files when a build exists."""
+    if not os.path.isfile(MANIFEST_PATH):
+        return
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for relpath, hashed in manifest.items():
+        _fingerprints[relpath] = hashed
+        _originals[hashed] = (BUILD_DIR, hashed)
+
+
+def fingerprint(relpath):
+    """Content-hashed name for a file under ASSET_ROOT (from the build, else hashed once per process)."""
+    hashed = _fingerprints.get(relpath)
+    if hashed is None:
+        with open(os.path.join(ASSET_ROOT, relpath), "rb") as f:
+            hashed = hashed_name(relpath, f.read())
+        _originals[hashed] = (ASSET_ROOT, relpath)
+        _fingerprints[relpath] = hashed
+    return hashed
+
+
+def asset_url(relpath):
+    return "/" + fingerprint(relpath)
+
+
+def resolve_fingerprinted(path):
+    """(directory, file) behind a fingerprinted path, or None if it isn't one (or is no longer current)."""
+    return _originals.get(path)
+
+
+def page_path(name):
+    """(directory, file) for an HTML page, preferring the build's copy with rewritten asset URLs."""
+    if os.path.isfile(os.path.join(BUILD_DIR, name)):
+        return BUILD_DIR, name
+    return ASSET_ROOT, name
+
+
+load_manifest()
@@ -0,0 +1,96 @@
+import os
+import re
+import glob
+import gzip
+import json
+import shutil
+
+from assets import ASSET_ROOT, BUILD_DIR, MANIFEST_PATH, hashed_name
+from compression import brotli
+
+# ==============================
+# CONFIG
+# ==============================
+ASSETS = [
+    "styles.css",
+    "design.css",
+    "script.js",
+    "inquiries.css",
+    "inquiries.js",
+] + sorted(
+    os.path.relpath(p, ASSET_ROOT)
+    for p in glob.glob(os.path.join(ASSET_ROOT, "send", "*"))
+    if os.path.isfile(p)
+)
+
+# Pages whose asset references get rewritten to the hashed URLs
+PAGES = ["index.html"]
+
+PRECOMPRESS_EXTENSIONS = (".css", ".js", ".html", ".json", ".svg")
+
+
+# ==============================
+# HELPERS
+# ==============================
+def write_file(relpath, data):
+    path = os.path.join(BUILD_DIR, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if relpath.endswith(PRECOMPRESS_EXTENSIONS):
+        precompress(path, data)
+
+
+def precompress(path, data):
+    """Write .gz (and .br) siblings, only when they are actually smaller."""
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(path + ".gz", "wb") as f:
+            f.write(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            with open(path + ".br", "wb") as f:
+                f.write(br)
+
+
+def rewrite_references(html, manifest):
+    """href="styles.css" / src="/script.js" -> the hashed absolute URL."""
+    def replace(match):
+        attr, quote, url = match.group(1), match.group(2), match.group(3)
+        hashed = manifest.get(url.lstrip("/"))
+        return f"{attr}={quote}/{hashed}{quote}" if hashed else match.group(0)
+
+    return re.sub(r'\b(href|src)=(["\'])([^"\']+)\2', replace, html)
+
+
+# ==============================
+# BUILD
+# ==============================
+def build():
+    shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    os.makedirs(BUILD_DIR)
+
+    manifest = {}
+    for relpath in ASSETS:
+        with open(os.path.join(ASSET_ROOT, relpath), "rb") as f:
+            data = f.read()
+        hashed = hashed_name(relpath, data)
+        write_file(hashed, data)
+        manifest[relpath] = hashed
+        print(f"📦 {relpath} -> {hashed}")
+
+    for page in PAGES:
+        with open(os.path.join(ASSET_ROOT, page), "r", encoding="utf-8") as f:
+            html = rewrite_references(f.read(), manifest)
+        write_file(page, html.encode("utf-8"))
+        print(f"📝 {page} rewritten")
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ Built {len(manifest)} assets into {BUILD_DIR}")
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,128 @@
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding, available=None):
+    """Best of br/gzip the client accepts (q > 0), or None."""
+    accepted = parse_accept_header(accept_encoding or "")
+    for encoding in available or (("br", "gzip") if brotli else ("gzip",)):
+        if accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=level["br"])
+        else:
+            self._gz = zlib.compressobj(level["gzip"], zlib.DEFLATED, 31)  # wbits 31 -> gzip container
+
+    def compress(self, chunk, flush):
+        if self.encoding == "br":
+            return self._br.process(chunk) + (self._br.flush() if flush else b"")
+        return self._gz.compress(chunk) + (self._gz.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush()
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware that gzip/brotli-compresses responses chunk by chunk.
+
+    Skips bodies below min_size, non-text content types and responses that are
+    already encoded (precompressed static files, prebuilt gzip payloads).
+    Streamed responses (no Content-Length) are flushed per chunk so they keep streaming.
+    """
+
+    def __init__(self, app, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.min_size = min_size
+        self.level = {"gzip": gzip_level, "br": brotli_quality}
+
+    def __call__(self, environ, start_response):
+        encoding = None
+        if environ.get("REQUEST_METHOD") != "HEAD":
+            encoding = choose_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        state = {"compress": False, "streamed": False}
+
+        def _start_response(status, headers, exc_info=None):
+            if self._should_compress(status, headers):
+                state.update(compress=True, streamed=_header(headers, "Content-Length") is None)
+                etag = _header(headers, "ETag")
+                vary = _header(headers, "Vary")
+                headers = [(k, v) for k, v in headers if k.lower() not in ("content-length", "etag", "vary")]
+                headers.append(("Content-Encoding", encoding))
+                headers.append(("Vary", _add_vary(vary)))
+                if etag:
+                    # same entity, different bytes: weak so If-None-Match still matches
+                    headers.append(("ETag", etag if etag.startswith("W/") else "W/" + etag))
+            return start_response(status, headers, exc_info)
+
+        body = self.app(environ, _start_response)
+        if not state["compress"]:
+            return body
+        return self._compress(body, encoding, state["streamed"])
+
+    def _should_compress(self, status, headers):
+        code = int(status.split(" ", 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        if _header(headers, "Content-Encoding"):
+            return False
+        content_type = (_header(headers, "Content-Type") or "").split(";")[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = _header(headers, "Content-Length")
+        return length is None or int(length) >= self.min_size
+
+    def _compress(self, body, encoding, streamed):
+        compressor = _Compressor(encoding, self.level)
+        try:
+            for chunk in body:
+                if chunk:
+                    out = compressor.compress(chunk, flush=streamed)
+                    if out:
+                        yield out
+            yield compressor.finish()
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(vary):
+    values = [v.strip() for v in (vary or "").split(",") if v.strip()]
+    if "accept-encoding" not in (v.lower() for v in values):
+        values.append("Accept-Encoding")
+    return ", ".join(values)
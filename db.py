@@ -0,0 +1,366 @@
+import os
+import time
+import atexit
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+
+# === Connection Settings ===
+# DATABASE_URL overrides the production database (e.g. a local Postgres for testing)
+DB_CONNINFO = os.environ.get("DATABASE_URL") or psycopg.conninfo.make_conninfo(
+    dbname="inmosuite",
+    user="inmosuite_user",
+    password="GlNtF89gavaJzBX3Vv3jGyzPe3vdOwGM",
+    host="dpg-d1smp82li9vc73c8hsr0-a.frankfurt-postgres.render.com",
+    port="5432",
+    sslmode="require",
+)
+
+# Optional read replica (streaming standby) for read-only endpoints, see get_db(readonly=True)
+DB_REPLICA_CONNINFO = os.environ.get("DATABASE_REPLICA_URL")
+
+# === Pool Settings (per worker process) ===
+POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", 300))          # close idle conns above min_size after N sec
+POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800))  # recycle every conn after N sec
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))              # max wait for a free conn
+POOL_MAX_WAITING = int(os.environ.get("DB_POOL_MAX_WAITING", 50))        # waiters beyond this are rejected
+# execute(..., prepare=True) and psycopg's automatic preparing (prepare_threshold) keep server-side
+# prepared statements per pooled connection; set to 0 behind a transaction-mode pgbouncer, which can't keep them
+PREPARE_STATEMENTS = os.environ.get("DB_PREPARE_STATEMENTS", "1") != "0"
+
+# === Replica Routing Settings ===
+REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", 10))              # seconds behind before reads go to the primary
+REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5))  # how often health/lag is re-checked
+REPLICA_CHECK_TIMEOUT = float(os.environ.get("DB_REPLICA_CHECK_TIMEOUT", 2))    # max wait for a replica conn when checking
+
+# === Slow Query Log Settings ===
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", 100))
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE", 0))  # 0..1, share of slow SELECTs to EXPLAIN ANALYZE
+SLOW_QUERY_EXPLAIN_MAX_PENDING = 4
+
+logger = logging.getLogger("crmvic.db")
+
+
+# === Per-Request DB Timing ===
+# Seconds spent waiting for a pooled connection vs executing statements, for the current request
+_request_db_time = contextvars.ContextVar("request_db_time", default=None)
+
+
+def start_db_timer():
+    timer = {"wait": 0.0, "execute": 0.0, "queries": 0}
+    _request_db_time.set(timer)
+    return timer
+
+
+def _add_db_time(kind, seconds):
+    timer = _request_db_time.get()
+    if timer is not None:
+        timer[kind] += seconds
+        if kind == "execute":
+            timer["queries"] += 1
+
+
+# === Slow Query Log ===
+# Newest last; entries get their "explain" filled in by a background worker when sampled
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_explain_pending = 0
+_explain_lock = threading.Lock()
+
+
+def slow_queries():
+    return list(reversed(_slow_queries))
+
+
+def _is_read_only(query):
+    # EXPLAIN ANALYZE runs the statement again, so only ever do it for plain reads
+    return query.lstrip("( \t\r\n").upper().startswith(("SELECT", "WITH"))
+
+
+def _explain(entry, query, params):
+    global _explain_pending
+    try:
+        with get_db() as conn:
+            cur = psycopg.Cursor(conn)  # plain cursor: don't time/log the EXPLAIN itself
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+            entry["explain"] = "\n".join(row["QUERY PLAN"] for row in cur.fetchall())
+            conn.rollback()
+    except Exception as e:
+        entry["explain"] = f"EXPLAIN failed: {e}"
+    finally:
+        with _explain_lock:
+            _explain_pending -= 1
+
+
+def _record_slow_query(query, params, elapsed_ms):
+    global _explain_pending
+    entry = {
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "duration_ms": round(elapsed_ms, 1),
+        "query": " ".join(query.split()),
+        "params": params,
+        "explain": None,
+    }
+    logger.warning("Slow query (%.1f ms): %s params=%r", elapsed_ms, entry["query"], params)
+    _slow_queries.append(entry)
+
+    if SLOW_QUERY_EXPLAIN_SAMPLE <= 0 or not _is_read_only(query) or random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE:
+        return
+    with _explain_lock:
+        if _explain_pending >= SLOW_QUERY_EXPLAIN_MAX_PENDING:
+            return
+        _explain_pending += 1
+    entry["explain"] = "pending"
+    _explain_executor.submit(_explain, entry, query, params)
+
+
+class TimedCursor(psycopg.Cursor):
+    def execute(self, query, params=None, **kwargs):
+        if not query:
+            return super().execute(query, params, **kwargs)  # pool health check
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _add_db_time("execute", elapsed)
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                if isinstance(query, bytes):
+                    text = query.decode("utf-8")
+                else:
+                    text = query if isinstance(query, str) else query.as_string(self)
+                _record_slow_query(text, params, elapsed * 1000)
+
+
+_pool = None
+_replica_pool = None
+_replica_monitor_stop = None
+_pool_lock = threading.Lock()
+
+_checkout_lock = threading.Lock()
+_checkout_stats = {"checkouts": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+
+def _open_pool(conninfo, name):
+    kwargs = {"row_factory": dict_row, "cursor_factory": TimedCursor}
+    if not PREPARE_STATEMENTS:
+        kwargs["prepare_threshold"] = None  # never prepare, not even with prepare=True
+    return ConnectionPool(
+        conninfo,
+        kwargs=kwargs,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        max_idle=POOL_MAX_IDLE,
+        max_lifetime=POOL_MAX_LIFETIME,
+        timeout=POOL_TIMEOUT,
+        max_waiting=POOL_MAX_WAITING,
+        check=ConnectionPool.check_connection,
+        name=name,
+        open=True,
+    )
+
+
+def get_pool():
+    """Create the process-wide (primary) pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _open_pool(DB_CONNINFO, "inmosuite")
+    return _pool
+
+
+def get_replica_pool():
+    """Replica pool, or None when no DATABASE_REPLICA_URL is configured."""
+    global _replica_pool, _replica_monitor_stop
+    if DB_REPLICA_CONNINFO and _replica_pool is None:
+        with _pool_lock:
+            if _replica_pool is None:
+                _replica_pool = _open_pool(DB_REPLICA_CONNINFO, "inmosuite-replica")
+                _replica_monitor_stop = threading.Event()
+                threading.Thread(
+                    target=_monitor_replica, args=(_replica_pool, _replica_monitor_stop),
+                    name="replica-health", daemon=True
+                ).start()
+    return _replica_pool
+
+
+def close_pool():
+    global _pool, _replica_pool
+    with _pool_lock:
+        if _replica_monitor_stop is not None:
+            _replica_monitor_stop.set()
+        for pool in (_pool, _replica_pool):
+            if pool is not None:
+                pool.close()
+        _pool = _replica_pool = None
+
+
+atexit.register(close_pool)
+
+
+def _record_checkout(elapsed_ms):
+    with _checkout_lock:
+        _checkout_stats["checkouts"] += 1
+        _checkout_stats["total_ms"] += elapsed_ms
+        _checkout_stats["max_ms"] = max(_checkout_stats["max_ms"], elapsed_ms)
+
+
+# === Replica Health ===
+# Re-checked every REPLICA_CHECK_INTERVAL by a background thread, so no request ever waits on a
+# slow or unreachable replica; requests only read the last result. Until the first check
+# completes, and whenever the replica is unreachable or lagging, reads go to the primary.
+_replica_health = {"healthy": False, "lag_seconds": None, "replay_lsn": None, "checked_at": 0.0, "error": None}
+_replica_counters = {"reads": 0, "fallbacks": 0}
+_replica_counters_lock = threading.Lock()
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag_seconds,
+    -- WAL position replayed so far, as a byte offset (comparable with the primary's pg_current_wal_lsn)
+    CASE
+        WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+        ELSE pg_current_wal_lsn()
+    END - '0/0'::pg_lsn AS replay_lsn
+"""
+
+
+def _check_replica(pool):
+    try:
+        with pool.connection(timeout=REPLICA_CHECK_TIMEOUT) as conn:
+            row = conn.execute(REPLICA_LAG_SQL).fetchone()
+        lag = float(row["lag_seconds"])
+        replay_lsn = int(row["replay_lsn"]) if row["replay_lsn"] is not None else None
+        healthy = lag <= REPLICA_MAX_LAG
+        error = None if healthy else f"lagging {lag:.1f}s behind the primary"
+    except Exception as e:
+        lag, replay_lsn, healthy, error = None, None, False, str(e)
+
+    if healthy != _replica_health["healthy"]:
+        if healthy:
+            logger.info("Replica healthy, routing reads to it")
+        else:
+            logger.warning("Replica unusable (%s), routing reads to the primary", error)
+    _replica_health.update(healthy=healthy, lag_seconds=lag, replay_lsn=replay_lsn, checked_at=time.monotonic(), error=error)
+
+
+def _monitor_replica(pool, stop):
+    while not stop.is_set():
+        _check_replica(pool)
+        stop.wait(REPLICA_CHECK_INTERVAL)
+
+
+def _read_pool(min_lsn=None):
+    """
+    The replica pool when it's configured, healthy and (with min_lsn) has replayed the primary's
+    WAL at least up to min_lsn, else the primary.
+    """
+    replica = get_replica_pool()
+    if replica is None:
+        return get_pool()
+    usable = _replica_health["healthy"]
+    if usable and min_lsn:
+        replay_lsn = _replica_health["replay_lsn"]
+        usable = replay_lsn is not None and replay_lsn >= min_lsn
+    with _replica_counters_lock:
+        _replica_counters["reads" if usable else "fallbacks"] += 1
+    return replica if usable else get_pool()
+
+
+def read_pool_waiting():
+    """Requests waiting for a connection of the pool readonly reads currently go to."""
+    replica = get_replica_pool()
+    pool = replica if replica is not None and _replica_health["healthy"] else get_pool()
+    return pool.get_stats().get("requests_waiting", 0)
+
+
+@contextmanager
+def get_db(readonly=False, min_lsn=None):
+    """
+    Borrow a pooled connection (dict rows).
+    Commits on success, rolls back on error and returns the connection to the pool.
+    readonly=True may be served by the read replica (possibly up to REPLICA_MAX_LAG behind);
+    anything that writes, or must see a write it just made, uses the primary.
+    min_lsn (a primary WAL position, as a byte offset) keeps readonly reads on the primary
+    until the replica has replayed past it, e.g. a feed import (see app.feed_lsn).
+    """
+    pool = _read_pool(min_lsn) if readonly else get_pool()
+    start = time.perf_counter()
+    with pool.connection() as conn:
+        waited = time.perf_counter() - start
+        _record_checkout(waited * 1000)
+        _add_db_time("wait", waited)
+        yield conn
+
+
+def replica_stats():
+    if not DB_REPLICA_CONNINFO:
+        return {"enabled": False}
+    checked_at = _replica_health["checked_at"]
+    with _replica_counters_lock:
+        counters = dict(_replica_counters)
+    raw = _replica_pool.get_stats() if _replica_pool is not None else {}
+    return {
+        "enabled": True,
+        "size": raw.get("pool_size", 0),
+        "in_use": raw.get("pool_size", 0) - raw.get("pool_available", 0),
+        "healthy": _replica_health["healthy"],
+        "lag_seconds": _replica_health["lag_seconds"],
+        "replay_lsn": _replica_health["replay_lsn"],
+        "max_lag_seconds": REPLICA_MAX_LAG,
+        "checked_seconds_ago": round(time.monotonic() - checked_at, 1) if checked_at else None,
+        "error": _replica_health["error"],
+        **counters,
+    }
+
+
+def pool_stats():
+    """Pool sizing numbers: in use, waiting, checkout latency."""
+    with _checkout_lock:
+        checkouts = dict(_checkout_stats)
+
+    stats = {
+        "min_size": POOL_MIN_SIZE,
+        "max_size": POOL_MAX_SIZE,
+        "max_waiting": POOL_MAX_WAITING,
+        "checkouts": checkouts["checkouts"],
+        "checkout_avg_ms": round(checkouts["total_ms"] / checkouts["checkouts"], 3) if checkouts["checkouts"] else 0.0,
+        "checkout_max_ms": round(checkouts["max_ms"], 3),
+    }
+
+    stats["replica"] = replica_stats()
+    if _pool is None:
+        stats.update(size=0, idle=0, in_use=0, waiting=0)
+        return stats
+
+    raw = _pool.get_stats()
+    size = raw.get("pool_size", 0)
+    idle = raw.get("pool_available", 0)
+    stats.update(
+        size=size,
+        idle=idle,
+        in_use=size - idle,
+        waiting=raw.get("requests_waiting", 0),
+        requests_queued=raw.get("requests_queued", 0),
+        requests_errors=raw.get("requests_errors", 0),
+        connections_opened=raw.get("connections_num", 0),
+        connections_errors=raw.get("connections_errors", 0),
+        connections_lost=raw.get("connections_lost", 0),
+    )
+    return stats
@@ -0,0 +1,200 @@
+import threading
+
+
+# === Listing Filters ===
+# Query parameter: (condition, parser). Served by the *_town_ref_idx / *_beds_price_idx
+# composite indexes (migrations/006_properties_filter_indexes.sql)
+PROPERTY_FILTERS = {
+    "min_price": ("p.price >= %s", int),
+    "max_price": ("p.price <= %s", int),
+    "min_beds": ("p.beds >= %s", int),
+    "min_baths": ("p.baths >= %s", int),
+    "town": ("LOWER(p.town) = LOWER(%s)", lambda value: value.strip().lower())
+}
+
+LISTING_COLUMNS = "p.ref, p.price, p.beds, p.baths, p.town, c.image_url AS cover_image"
+
+
+class Feed:
+    """
+    One property feed and the SQL generated from it (built once, then reused so pooled
+    connections can run it as prepared statements).
+
+    listing_key: column of the properties table that the feed's images point at
+    image_key:   expression for that reference on an image row (aliased i), comparable to listing_key
+    A new feed also needs its {name}_cover_images table and indexes, see migrations/.
+    """
+
+    def __init__(self, name, table, image_table, image_column="url", listing_key="id", image_key="i.property_id"):
+        self.name = name
+        self.table = table
+        self.image_table = image_table
+        self.image_column = image_column
+        self.listing_key = listing_key
+        self.image_key = image_key
+        self.cover_table = f"{name}_cover_images"
+        self.cover_join = f"LEFT JOIN {self.cover_table} c ON c.property_key = p.{listing_key}"
+
+        self._listing_sql = {}
+        self._listing_lock = threading.Lock()
+
+        # Full row plus ordered gallery (SELECT p.*: not prepared, a column change would break the plan)
+        self.detail_sql = f"""
+            SELECT p.*, COALESCE((
+                SELECT json_agg(i.{image_column} ORDER BY i.image_order)
+                FROM {image_table} i
+                WHERE {image_key} = p.{listing_key} AND i.{image_column} IS NOT NULL
+            ), '[]') AS images
+            FROM {table} p
+            WHERE p.ref = %s
+            LIMIT 1
+        """
+
+        self.galleries_sql = f"""
+            SELECT p.ref, COALESCE(
+                json_agg(i.{image_column} ORDER BY i.image_order) FILTER (WHERE i.{image_column} IS NOT NULL),
+                '[]'
+            ) AS images
+            FROM {table} p
+            LEFT JOIN {image_table} i ON {image_key} = p.{listing_key}
+            WHERE p.ref = ANY(%s)
+            GROUP BY p.ref
+        """
+
+        # Incremental cover refresh: write only changed covers, then drop the ones that disappeared
+        self.cover_upsert_sql = f"""
+            INSERT INTO {self.cover_table} AS c (property_key, image_url)
+            SELECT DISTINCT ON (i.property_id) {image_key}, i.{image_column}
+            FROM {image_table} i
+            WHERE i.image_order = 1 AND i.{image_column} IS NOT NULL
+            ORDER BY i.property_id
+            ON CONFLICT (property_key) DO UPDATE SET image_url = EXCLUDED.image_url
+            WHERE c.image_url IS DISTINCT FROM EXCLUDED.image_url
+        """
+        self.cover_prune_sql = f"""
+            DELETE FROM {self.cover_table} c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {image_table} i
+                WHERE {image_key} = c.property_key
+                  AND i.image_order = 1 AND i.{image_column} IS NOT NULL
+            )
+        """
+
+    def _where(self, filter_names, seek=False):
+        conditions = [PROPERTY_FILTERS[name][0] for name in filter_names]
+        if seek:
+            conditions.append("p.ref < %s")
+        return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    def listing_sql(self, filter_names=(), seek=False):
+        """
+        One page ordered by ref DESC. Params: filter values (in filter_names order),
+        then the seek ref if seek, then LIMIT and OFFSET.
+        Generated once per filter combination so the text (and prepared statement) is reused.
+        """
+        key = (tuple(filter_names), seek)
+        sql = self._listing_sql.get(key)
+        if sql is None:
+            with self._listing_lock:
+                sql = self._listing_sql.setdefault(key, f"""
+                    SELECT {LISTING_COLUMNS}
+                    FROM {self.table} p
+                    {self.cover_join}
+                    {self._where(filter_names, seek)}
+                    ORDER BY p.ref DESC
+                    LIMIT %s OFFSET %s
+                """)
+        return sql
+
+    def export_sql(self, filter_names=()):
+        return f"""
+            SELECT {LISTING_COLUMNS}
+            FROM {self.table} p
+            {self.cover_join}
+            {self._where(filter_names)}
+            ORDER BY p.ref DESC
+        """
+
+    def search_sql(self, position, bulk=False):
+        """This feed's branch of the cross-feed search (see SEARCH_SQL / BULK_SEARCH_SQL)."""
+        if bulk:
+            return f"""(
+                SELECT DISTINCT ON (LOWER(p.ref))
+                       '{self.name}' AS feed, {position} AS feed_order, LOWER(p.ref) AS ref_key,
+                       {LISTING_COLUMNS}
+                FROM {self.table} p
+                {self.cover_join}
+                WHERE LOWER(p.ref) = ANY(%(refs)s)
+                ORDER BY LOWER(p.ref)
+            )"""
+        return f"""(
+            SELECT '{self.name}' AS feed, {position} AS feed_order,
+                   {LISTING_COLUMNS}
+            FROM {self.table} p
+            {self.cover_join}
+            WHERE LOWER(p.ref) = LOWER(%(ref)s)
+            LIMIT 1
+        )"""
+
+    def suggest_sql(self, position, with_contains):
+        """
+        Prefix (and optionally substring) matches of this feed for the typeahead.
+        The prefix branch walks the *_ref_prefix_c_idx index in order, so LIMIT stops it early;
+        it returns %(candidates)s rows (more than the limit) for the outer query to rank shortest first.
+        """
+        branches = [f"""(
+            SELECT '{self.name}' AS feed, {position} AS feed_order, 0 AS match_rank, p.ref
+            FROM {self.table} p
+            WHERE LOWER(p.ref) COLLATE "C" LIKE %(prefix)s
+            ORDER BY LOWER(p.ref) COLLATE "C"
+            LIMIT %(candidates)s
+        )"""]
+        if with_contains:
+            branches.append(f"""(
+                SELECT '{self.name}' AS feed, {position} AS feed_order, 1 AS match_rank, p.ref
+                FROM {self.table} p
+                WHERE LOWER(p.ref) LIKE %(contains)s
+                  AND LOWER(p.ref) NOT LIKE %(prefix)s
+                ORDER BY LENGTH(p.ref), LOWER(p.ref)
+                LIMIT %(limit)s
+            )""")
+        return branches
+
+
+# === Registry ===
+# Order matters: it's the order feeds are listed in cross-feed search results
+FEEDS = {feed.name: feed for feed in (
+    # resales images point at the listing's ref (as a number), so they are compared as text
+    Feed("resales", "resales_properties", "resales_property_images",
+         image_column="image_url", listing_key="ref", image_key="CAST(i.property_id AS TEXT)"),
+    Feed("kyero", "kyero_properties", "kyero_property_images"),
+    Feed("propmls", "propmls_properties", "propmls_property_images"),
+)}
+
+
+# === Cross-Feed Statements ===
+# One statement for all feeds; LOWER(p.ref) is served by the *_ref_lower_idx expression indexes
+SEARCH_SQL = "\nUNION ALL\n".join(
+    feed.search_sql(position) for position, feed in enumerate(FEEDS.values())
+) + "\nORDER BY feed_order"
+
+# Many refs at once, each feed matched with = ANY (same indexes)
+BULK_SEARCH_SQL = "\nUNION ALL\n".join(
+    feed.search_sql(position, bulk=True) for position, feed in enumerate(FEEDS.values())
+) + "\nORDER BY feed_order"
+
+
+def _suggest_sql(with_contains):
+    branches = [branch for position, feed in enumerate(FEEDS.values())
+                for branch in feed.suggest_sql(position, with_contains)]
+    return f"""
+        SELECT feed, ref FROM (
+            {" UNION ALL ".join(branches)}
+        ) matches
+        ORDER BY match_rank, LENGTH(ref), LOWER(ref), feed_order
+        LIMIT %(limit)s
+    """
+
+
+SUGGEST_PREFIX_SQL = _suggest_sql(with_contains=False)
+SUGGEST_SQL = _suggest_sql(with_contains=True)
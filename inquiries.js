@@ -0,0 +1,654 @@
+// Register the plugin with Chart.js
+Chart.register(ChartDataLabels);
+
+  const fetchJson = url => fetch(url).then(res => {
+    if (!res.ok) throw new Error("API call failed");
+    return res.json();
+  });
+
+  // Buyer charts use the server-side pre-aggregated series, not the raw buyer records
+  Promise.all([fetchJson('/api/inquiries?buyers=0'), fetchJson('/api/inquiries/buyers')])
+    .then(([data, buyerSeries]) => {
+function buildLastNMonths(n = 24) {
+  const out = [];
+  const now = new Date();
+  for (let i = n - 1; i >= 0; i--) {
+    const d = new Date(now.getFullYear(), now.getMonth() - i, 1);
+    out.push(`${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}`);
+  }
+  return out;
+}
+
+const months = Object.keys(data)
+  .filter(k => /^\d{4}-\d{2}$/.test(k))
+  .sort();
+
+      const autoimport = [];
+      const wishlist = [];
+      const bgAuto = [];
+      const bgWish = [];
+
+      // instead of building table HTML
+// Collect unique sources
+const sourceSet = new Set();
+months.forEach(month => {
+  if (data[month]) {
+    Object.keys(data[month].sources || {}).forEach(src => sourceSet.add(src));
+  }
+});
+const sources = Array.from(sourceSet);
+
+const datasets = [];
+
+// Add per-source stacks
+sources.forEach((src, i) => {
+  let color;
+  const cleanLabel = src.replace("Subject: ", "").toLowerCase();
+
+  if (cleanLabel.includes("pisos.com")) {
+    color = "rgba(255, 159, 64, 0.8)"; // orange for pisos.com
+  } else if (cleanLabel.includes("kyero")) {
+    color = "rgba(255, 99, 132, 0.8)"; // reddish for kyero
+  } else {
+    // fallback to auto HSL colors for other sources
+    color = `hsl(${(i * 60) % 360}, 60%, 60%)`;
+  }
+
+  datasets.push({
+    label: src.replace("Subject: ", ""),
+    data: months.map(m => data[m]?.sources?.[src] || 0),
+    backgroundColor: color,
+    stack: "sources"
+  });
+});
+
+// ====== Buyers charts (Budget & Nationality) ======
+// Series come pre-aggregated from /api/inquiries/buyers (per month and since January 2025)
+const monthKeys = buyerSeries.months;
+const PRICE_BUCKET_LABELS = buyerSeries.price_buckets;
+
+function buyerSeriesFor(mode, monthKey) {
+  if (mode !== "monthly") return buyerSeries.ytd;
+  return buyerSeries.monthly[monthKey] || {
+    budget: PRICE_BUCKET_LABELS.map(() => 0),
+    nationality: [],
+    budget_by_nationality: { nationalities: [], counts: PRICE_BUCKET_LABELS.map(() => []) }
+  };
+}
+
+// Chart instances (for clean re-render)
+let CHART_budgetOverTime = null;
+let CHART_nationality = null;
+let CHART_budgetByNationality = null;
+
+function destroyIfExists(ch){
+  if (ch && typeof ch.destroy === "function") ch.destroy();
+}
+
+// ===== Chart 1: Budget distribution over time =====
+// - Monthly: x = price buckets, values = counts for the selected month
+// - YTD:     x = months, stacked by price buckets (trend across the year)
+function renderBudgetOverTime(mode, monthKey){
+  const ctx = document.getElementById("buyersBudgetOverTimeChart");
+  destroyIfExists(CHART_budgetOverTime);
+
+  if (mode === "monthly") {
+    const counts = buyerSeriesFor(mode, monthKey).budget;
+
+    CHART_budgetOverTime = new Chart(ctx, {
+      type: "bar",
+      data: {
+        labels: PRICE_BUCKET_LABELS,
+        datasets: [{ label: `Inquiries (${monthKey})`, data: counts, backgroundColor: "rgba(54,162,235,0.7)" }]
+      },
+      options: {
+        responsive:true, maintainAspectRatio:false,
+        plugins:{ legend:{display:false}, datalabels:{ display:false } },
+        scales:{ y:{ beginAtZero:true, ticks:{ stepSize:1 } } }
+      },
+      plugins:[ChartDataLabels]
+    });
+  } else {
+    // YTD stacked by buckets over months
+    const datasets = PRICE_BUCKET_LABELS.map((label,i) => ({
+      label,
+      data: buyerSeries.ytd.budget_by_month[i],
+      backgroundColor: `hsl(${(i*45)%360},60%,60%)`,
+      stack:"buckets"
+    }));
+
+    CHART_budgetOverTime = new Chart(ctx, {
+      type:"bar",
+      data:{ labels: monthKeys, datasets },
+      options:{
+        responsive:true, maintainAspectRatio:false,
+        plugins:{ legend:{ position:"top" }, datalabels:{ display:false } },
+        scales:{ x:{ stacked:true }, y:{ stacked:true, beginAtZero:true } }
+      },
+      plugins:[ChartDataLabels]
+    });
+  }
+}
+
+// ===== Chart 2: Inquiries by Nationality (counts) =====
+// - Monthly: counts per nationality for selected month
+// - YTD:     counts per nationality across current year
+function renderNationality(mode, monthKey){
+  const ctx = document.getElementById("buyersNationalityChart");
+  destroyIfExists(CHART_nationality);
+
+  // Top 12 nationalities + others
+  const main = buyerSeriesFor(mode, monthKey).nationality;
+
+  CHART_nationality = new Chart(ctx, {
+    type:"bar",
+    data:{
+      labels: main.map(e=>e[0]),
+      datasets:[{ label:"Inquiries", data: main.map(e=>e[1]), backgroundColor:"rgba(75,192,192,0.7)" }]
+    },
+    options:{
+      responsive:true, maintainAspectRatio:false,
+      plugins:{ legend:{display:false}, datalabels:{ display:false } },
+      scales:{ y:{ beginAtZero:true, ticks:{ stepSize:1 } } }
+    },
+    plugins:[ChartDataLabels]
+  });
+}
+
+// ===== Chart 3: Budget by Nationality (stacked buckets) =====
+// - Monthly: for selected month
+// - YTD:     for current year
+function renderBudgetByNationality(mode, monthKey){
+  const ctx = document.getElementById("buyersBudgetByNationalityChart");
+  destroyIfExists(CHART_budgetByNationality);
+
+  // Top 10 nationalities by total, counts[bucket][nationality]
+  const { nationalities: topNats, counts } = buyerSeriesFor(mode, monthKey).budget_by_nationality;
+
+  const datasets = PRICE_BUCKET_LABELS.map((label, i)=>({
+    label,
+    data: counts[i],
+    backgroundColor:`hsl(${(i*45)%360},60%,60%)`,
+    stack:"buckets"
+  }));
+
+  CHART_budgetByNationality = new Chart(ctx, {
+    type:"bar",
+    data:{ labels: topNats, datasets },
+    options:{
+      responsive:true, maintainAspectRatio:false,
+      plugins:{
+        legend:{ position:"top" },
+        tooltip:{
+          mode:"index", intersect:false,
+          callbacks:{ label: (ctx)=> `${ctx.dataset.label}: ${ctx.raw}` }
+        },
+        datalabels:{ display:false }
+      },
+      scales:{ x:{ stacked:true }, y:{ stacked:true, beginAtZero:true } }
+    },
+    plugins:[ChartDataLabels]
+  });
+}
+
+
+function setupIndependentControls(chartName, renderFn) {
+  const radios = document.querySelectorAll(`input[name="mode${chartName}"]`);
+  const select = document.getElementById(`month${chartName}`);
+
+  // populate month options
+select.innerHTML = monthKeys.map(m => {
+  const d = new Date(`${m}-01T00:00:00`);
+  return `<option value="${m}">
+    ${d.toLocaleString(undefined,{month:"long", year:"numeric"})}
+  </option>`;
+}).join("");
+
+  let mode = "monthly";
+  radios.forEach(r => {
+    r.addEventListener("change", e => {
+      mode = e.target.value;
+      select.disabled = (mode !== "monthly");
+      renderFn(mode, select.value);
+    });
+  });
+  select.addEventListener("change", () => renderFn(mode, select.value));
+  renderFn(mode, select.value); // initial render
+}
+
+if (buyerSeries.total_buyers) {
+  setupIndependentControls("BudgetOverTime", renderBudgetOverTime);
+  setupIndependentControls("Nationality", renderNationality);
+  setupIndependentControls("BudgetByNationality", renderBudgetByNationality);
+}
+
+
+      const topLocations = data["top_viewed_locations"] || [];
+      if (topLocations.length > 0) {
+        const locationLabels = topLocations.map(loc => loc.name);
+        const locationViews = topLocations.map(loc => loc.views);
+
+        new Chart(document.getElementById('locationsChart'), {
+          type: 'bar',
+          data: {
+            labels: locationLabels,
+            datasets: [{
+              label: 'Views per Location',
+              data: locationViews,
+              backgroundColor: 'rgba(153, 102, 255, 0.7)'
+            }]
+          },
+          options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+              legend: { display: false },
+              tooltip: {
+                callbacks: {
+                  label: ctx => `${ctx.raw} views`
+                }
+              },
+              datalabels: {
+                anchor: 'end',
+                align: 'end',
+                color: '#333',
+                font: { weight: 'bold' },
+                formatter: value => value > 0 ? value : ''
+              }
+            },
+            scales: {
+              y: { beginAtZero: true }
+            }
+          },
+          plugins: [ChartDataLabels]
+        });
+      }
+
+
+// === Price Range Views Chart ===
+const priceRangeData = data["views_by_price_range"] || {};
+if (Object.keys(priceRangeData).length > 0) {
+  // 🟢 Step 1: merge all ranges >= 1500000 into one
+  const mergedData = {};
+  let over1_5MTotal = 0;
+
+  Object.entries(priceRangeData).forEach(([range, count]) => {
+    let low = 0, high = 0;
+
+    if (range.includes("+")) {
+      low = parseInt(range);
+      high = Infinity;
+    } else {
+      [low, high] = range.split("-").map(n => parseInt(n));
+    }
+
+    if (low >= 1500000) {
+      over1_5MTotal += count;
+    } else {
+      mergedData[range] = (mergedData[range] || 0) + count;
+    }
+  });
+
+  if (over1_5MTotal > 0) {
+    mergedData["1500000+"] = over1_5MTotal;
+  }
+
+  // 🟢 Step 2: sort ranges
+  const labels = Object.keys(mergedData).sort((a, b) => {
+    if (a.includes("+")) return 1;
+    if (b.includes("+")) return -1;
+    const aLow = parseInt(a.split("-")[0]) || 0;
+    const bLow = parseInt(b.split("-")[0]) || 0;
+    return aLow - bLow;
+  });
+
+  const values = labels.map(l => mergedData[l]);
+
+  // 🟢 Step 3: build chart
+  new Chart(document.getElementById("priceRangeChart"), {
+    type: "bar",
+    data: {
+      labels: labels,
+      datasets: [{
+        label: "Total Views",
+        data: values,
+        backgroundColor: "rgba(255, 205, 86, 0.7)"
+      }]
+    },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false,
+      plugins: {
+        legend: { display: false },
+        tooltip: {
+          callbacks: {
+            label: ctx => `${ctx.raw} views`
+          }
+        },
+        datalabels: {
+          anchor: "end",
+          align: "end",
+          color: "#333",
+          font: { weight: "bold" },
+          formatter: value => value > 0 ? value : ""
+        }
+      },
+      scales: {
+        x: {
+          ticks: {
+            callback: function(value, index) {
+              const range = labels[index];
+              if (range.includes("+")) return "1.5M+";
+              const [low, high] = range.split("-").map(n => parseInt(n));
+              return `${low/1000}k-${high/1000}k`;
+            }
+          }
+        },
+        y: { beginAtZero: true }
+      }
+    },
+    plugins: [ChartDataLabels]
+  });
+}
+
+const topCountries = data["top_viewer_countries"] || [];
+if (topCountries.length > 0) {
+  const countryLabels = topCountries.map(c => c.country);
+  const countryViews = topCountries.map(c => c.views);
+
+  new Chart(document.getElementById('countriesChart'), {
+    type: 'bar',
+    data: {
+      labels: countryLabels,
+      datasets: [{
+        label: 'Views by Country',
+        data: countryViews,
+        backgroundColor: 'rgba(75, 192, 192, 0.7)'
+      }]
+    },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false,
+      plugins: {
+        legend: { display: false },
+        datalabels: {
+          anchor: 'end',
+          align: 'end',
+          color: '#333',
+          font: { weight: 'bold' },
+          formatter: value => value > 0 ? value : ''
+        }
+      },
+      scales: { y: { beginAtZero: true } }
+    },
+    plugins: [ChartDataLabels]
+  });
+}
+
+// === Views by Price Range & Nationality ===
+const priceNatData = data["views_by_price_and_nationality"] || {};
+if (Object.keys(priceNatData).length > 0) {
+  // 🟢 Step 1: normalize ranges → merge all >= 1500000 into one
+  const mergedData = {};
+
+  Object.entries(priceNatData).forEach(([country, ranges]) => {
+    mergedData[country] = {};
+    let over1_5MTotal = 0;
+
+    Object.entries(ranges).forEach(([range, count]) => {
+      let low = 0;
+      let high = 0;
+
+      if (range.includes("+")) {
+        low = parseInt(range); // e.g. "5000000+" → 5000000
+        high = Infinity;
+      } else {
+        [low, high] = range.split("-").map(n => parseInt(n));
+      }
+
+      if (low >= 1500000) {
+        over1_5MTotal += count;
+      } else {
+        mergedData[country][range] = (mergedData[country][range] || 0) + count;
+      }
+    });
+
+    if (over1_5MTotal > 0) {
+      mergedData[country]["1500000+"] = over1_5MTotal;
+    }
+  });
+
+  // 🟢 Step 2: collect all ranges again (after merge)
+  const allRanges = new Set();
+  Object.values(mergedData).forEach(ranges => {
+    Object.keys(ranges).forEach(r => allRanges.add(r));
+  });
+
+  // Sort ranges: numeric, with "1500000+" last
+  const priceRanges = Array.from(allRanges).sort((a, b) => {
+    if (a.includes("+")) return 1;
+    if (b.includes("+")) return -1;
+    const aLow = parseInt(a.split("-")[0]) || 0;
+    const bLow = parseInt(b.split("-")[0]) || 0;
+    return aLow - bLow;
+  });
+
+  // 🟢 Step 3: sort countries by total views
+  const countryTotals = {};
+  Object.entries(mergedData).forEach(([country, ranges]) => {
+    countryTotals[country] = Object.values(ranges).reduce((a, b) => a + b, 0);
+  });
+  const sortedCountries = Object.keys(countryTotals).sort(
+    (a, b) => countryTotals[b] - countryTotals[a]
+  );
+
+  // 🟢 Step 4: build datasets
+  const datasets = sortedCountries.map((country, idx) => ({
+    label: country,
+    data: priceRanges.map(r => mergedData[country]?.[r] || 0),
+    backgroundColor: `hsl(${(idx * 50) % 360}, 60%, 60%)`
+  }));
+
+  // 🟢 Step 5: draw chart
+  new Chart(document.getElementById("priceNationalityChart"), {
+    type: "bar",
+    data: { labels: priceRanges, datasets },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false,
+      plugins: {
+        tooltip: {
+          mode: "index",
+          intersect: false,
+          itemSort: (a, b) => b.raw - a.raw, // high → low
+          callbacks: {
+            label: ctx => `${ctx.dataset.label}: ${ctx.raw} views`
+          }
+        },
+        legend: { display: false },   // ❌ hide countries + colors
+        datalabels: { display: false }
+      },
+      scales: {
+        x: {
+          stacked: true,
+          ticks: {
+            callback: function(value, index) {
+              const range = this.getLabelForValue(value);
+              if (range.includes("+")) return "1.5M+";
+              const [low, high] = range.split("-").map(n => parseInt(n));
+              return `${low / 1000}k-${high / 1000}k`;
+            }
+          }
+        },
+        y: { stacked: true, beginAtZero: true }
+      }
+    },
+    plugins: [ChartDataLabels]
+  });
+}
+
+
+
+const topProperties = data["top_viewed_links"] || [];
+if (topProperties.length > 0) {
+  let html = "<table class='top-properties-table'>";
+  html += "<thead><tr><th>Rank</th><th>Reference</th><th>Views</th><th>Link</th></tr></thead><tbody>";
+  topProperties.forEach((p, idx) => {
+    html += `<tr>
+      <td>${idx + 1}</td>
+      <td>${p.ref}</td>
+      <td>${p.views}</td>
+      <td><a href="${p.link}" target="_blank">View</a></td>
+    </tr>`;
+  });
+  html += "</tbody></table>";
+  document.getElementById("topPropertiesContainer").innerHTML = html;
+}
+
+new Chart(document.getElementById("sourceBreakdownChart"), {
+  type: "bar",
+  data: { labels: months, datasets },
+  options: {
+    responsive: true,
+    maintainAspectRatio: false,
+    plugins: {
+      tooltip: { mode: "index", intersect: false },
+      legend: { position: "top" },
+      datalabels: {
+        color: "#333",
+        font: { weight: "bold" },
+        formatter: v => v > 0 ? v : ""
+      }
+    },
+    scales: {
+      x: { stacked: true },
+      y: { stacked: true, beginAtZero: true }
+    }
+  },
+  plugins: [ChartDataLabels]
+});
+
+
+      months.forEach(month => {
+        if (data[month]) {
+          autoimport.push(data[month].autoimport_total);
+          wishlist.push(data[month].wishlist_total);
+          bgAuto.push('rgba(54, 162, 235, 0.6)');
+          bgWish.push('rgba(255, 99, 132, 0.6)');
+        } else {
+          autoimport.push(0);
+          wishlist.push(0);
+          bgAuto.push('rgba(200, 200, 200, 0.3)');
+          bgWish.push('rgba(180, 180, 180, 0.3)');
+        }
+      });
+
+            // === 📈 Line Chart: Property Views ===
+      let lastDataIndex = months.findLastIndex(month => data[month]?.property_views > 0);
+
+// If no data, show nothing
+if (lastDataIndex === -1) lastDataIndex = 0;
+
+// Trim months and viewsData to only that range
+const trimmedMonths = months.slice(0, lastDataIndex + 1);
+const viewsData = trimmedMonths.map(month => data[month]?.property_views || 0);
+      const viewColors = viewsData.map(val => val > 0 ? 'rgba(34,197,94,0.5)' : 'rgba(180,180,180,0.3)');
+
+      new Chart(document.getElementById('viewsChart'), {
+  type: 'line',
+  data: {
+    labels: trimmedMonths,
+    datasets: [{
+      label: 'Property Views',
+      data: viewsData,
+      fill: false,
+      tension: 0.3,
+      borderColor: 'rgba(34,197,94,1)',
+      backgroundColor: 'rgba(34,197,94,0.5)',
+      pointRadius: 5,
+      pointHoverRadius: 7
+    }]
+        },
+        options: {
+          responsive: true,
+          maintainAspectRatio: false,
+          animation: { duration: 1000 },
+          plugins: {
+            legend: { display: false },
+            tooltip: {
+              callbacks: {
+                label: ctx => `Views: ${ctx.raw}`
+              }
+            },
+            datalabels: {
+              align: 'top',
+              anchor: 'end',
+              color: '#10b981',
+              font: { weight: 'bold' },
+              formatter: (value) => value > 0 ? value : ''
+            }
+          },
+scales: {
+  y: {
+    beginAtZero: true,
+    suggestedMax: Math.max(...viewsData) + 5000,
+    ticks: {
+      callback: (value) => value.toLocaleString()
+    }
+  }
+}
+        },
+        plugins: [ChartDataLabels]
+      });
+
+      new Chart(document.getElementById('inquiryChart'), {
+        type: 'bar',
+        data: {
+          labels: months,
+          datasets: [
+            {
+              label: 'Autoimport Contacts',
+              data: autoimport,
+              backgroundColor: bgAuto
+            },
+            {
+              label: 'Wishlist Only',
+              data: wishlist,
+              backgroundColor: bgWish
+            }
+          ]
+        },
+        options: {
+          responsive: true,
+          maintainAspectRatio: false,
+          animation: { duration: 1000 },
+          plugins: {
+            legend: { position: 'top' },
+            tooltip: {
+              callbacks: {
+                label: ctx => `${ctx.dataset.label}: ${ctx.raw}`
+              }
+            },
+            // 🔢 Add values on top of bars
+            datalabels: {
+              anchor: 'end',
+              align: 'end',
+              color: '#333',
+              font: { weight: 'bold' },
+              formatter: value => value > 0 ? value : ''
+            }
+          },
+          scales: {
+            y: {
+              beginAtZero: true,
+              ticks: { stepSize: 1 }
+            }
+          }
+        },
+        plugins: [ChartDataLabels] // 👈 Activate plugin for labels
+      });
+
+    })
+    .catch(err => {
+      alert("Failed to load data: " + err.message);
+    });
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import psycopg
+
+from db import DB_CONNINFO
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def split_statements(sql):
+    """Split a migration file on ';' line endings."""
+    lines = [l for l in sql.splitlines() if not l.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";\n") if s.strip().rstrip(";")]
+
+
+def run_migrations(conninfo=DB_CONNINFO):
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        applied = {r[0] for r in conn.execute("SELECT name FROM schema_migrations")}
+
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if not name.endswith(".sql") or name in applied:
+                continue
+
+            print(f"➡️  Applying {name}...")
+            with open(os.path.join(MIGRATIONS_DIR, name), "r", encoding="utf-8") as f:
+                sql = f.read()
+            # CREATE INDEX CONCURRENTLY can't run inside a multi-statement (implicit) transaction
+            statements = split_statements(sql) if "CONCURRENTLY" in sql.upper() else [sql]
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            print(f"✅ Applied {name}")
+
+
+if __name__ == "__main__":
+    run_migrations(sys.argv[1] if len(sys.argv) > 1 else DB_CONNINFO)
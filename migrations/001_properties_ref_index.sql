@@ -0,0 +1,4 @@
+-- Keyset pagination on /api/properties: ORDER BY ref DESC / WHERE ref < cursor
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_ref_idx ON resales_properties (ref);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_ref_idx ON kyero_properties (ref);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_ref_idx ON propmls_properties (ref);
@@ -0,0 +1,2 @@
+-- Keyset pagination on /api/contacts: WHERE role = %s AND id < cursor ORDER BY id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contacts_role_id_idx ON contacts (role, id DESC);
@@ -0,0 +1,8 @@
+-- Case-insensitive reference lookup in /api/search: WHERE LOWER(p.ref) = LOWER(%s)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_ref_lower_idx ON resales_properties (LOWER(ref));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_ref_lower_idx ON kyero_properties (LOWER(ref));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_ref_lower_idx ON propmls_properties (LOWER(ref));
+-- expression indexes only get planner statistics after an ANALYZE
+ANALYZE resales_properties;
+ANALYZE kyero_properties;
+ANALYZE propmls_properties;
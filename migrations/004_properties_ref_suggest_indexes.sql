@@ -0,0 +1,10 @@
+-- /api/search/suggest: prefix matches on LOWER(ref) LIKE 'abc%' ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_ref_prefix_idx ON resales_properties (LOWER(ref) text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_ref_prefix_idx ON kyero_properties (LOWER(ref) text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_ref_prefix_idx ON propmls_properties (LOWER(ref) text_pattern_ops);
+
+-- ... and substring matches on LOWER(ref) LIKE '%abc%'
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_ref_trgm_idx ON resales_properties USING gin (LOWER(ref) gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_ref_trgm_idx ON kyero_properties USING gin (LOWER(ref) gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_ref_trgm_idx ON propmls_properties USING gin (LOWER(ref) gin_trgm_ops);
@@ -0,0 +1,42 @@
+-- Cover image (image_order = 1) per listing, keyed by the column the listing queries join on,
+-- so listings use a plain primary-key join instead of a LATERAL lookup into *_property_images.
+-- Kept up to date by refresh_cover_images() in app.py after every feed import.
+
+-- resales images point at the listing's ref, stored as text here so the join needs no cast
+CREATE TABLE IF NOT EXISTS resales_cover_images (
+    property_key TEXT PRIMARY KEY,
+    image_url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kyero_cover_images (
+    property_key BIGINT PRIMARY KEY,
+    image_url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS propmls_cover_images (
+    property_key BIGINT PRIMARY KEY,
+    image_url TEXT NOT NULL
+);
+
+INSERT INTO resales_cover_images (property_key, image_url)
+SELECT DISTINCT ON (property_id) CAST(property_id AS TEXT), image_url
+FROM resales_property_images
+WHERE image_order = 1 AND image_url IS NOT NULL
+ORDER BY property_id
+ON CONFLICT (property_key) DO NOTHING;
+
+INSERT INTO kyero_cover_images (property_key, image_url)
+SELECT DISTINCT ON (property_id) property_id, url
+FROM kyero_property_images
+WHERE image_order = 1 AND url IS NOT NULL
+ORDER BY property_id
+ON CONFLICT (property_key) DO NOTHING;
+
+INSERT INTO propmls_cover_images (property_key, image_url)
+SELECT DISTINCT ON (property_id) property_id, url
+FROM propmls_property_images
+WHERE image_order = 1 AND url IS NOT NULL
+ORDER BY property_id
+ON CONFLICT (property_key) DO NOTHING;
+
+ANALYZE resales_cover_images;
+ANALYZE kyero_cover_images;
+ANALYZE propmls_cover_images;
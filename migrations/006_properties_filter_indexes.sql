@@ -0,0 +1,14 @@
+-- Filtered /api/properties: town equality keeps the ref DESC keyset order within the index ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_town_ref_idx ON resales_properties (LOWER(town), ref);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_town_ref_idx ON kyero_properties (LOWER(town), ref);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_town_ref_idx ON propmls_properties (LOWER(town), ref);
+
+-- ... and "N+ beds within a price range" without a town
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_beds_price_idx ON resales_properties (beds, price);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_beds_price_idx ON kyero_properties (beds, price);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_beds_price_idx ON propmls_properties (beds, price);
+
+-- expression indexes only get planner statistics after an ANALYZE
+ANALYZE resales_properties;
+ANALYZE kyero_properties;
+ANALYZE propmls_properties;
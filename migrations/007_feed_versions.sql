@@ -0,0 +1,10 @@
+-- One counter per feed, bumped after every import (POST /api/cache/invalidate).
+-- Property page ETags and cache keys include it, so a bump invalidates both.
+CREATE TABLE IF NOT EXISTS feed_versions (
+    feed TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO feed_versions (feed) VALUES ('resales'), ('kyero'), ('propmls')
+ON CONFLICT (feed) DO NOTHING;
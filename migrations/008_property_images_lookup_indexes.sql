@@ -0,0 +1,8 @@
+-- Galleries: all images of a listing in image_order (/api/properties/<feed>/<ref>, /api/properties/galleries).
+-- resales images reference the listing's ref, so its index is on the text form the lookup compares.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_property_images_property_key_idx ON resales_property_images (CAST(property_id AS TEXT), image_order);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_property_images_property_id_idx ON kyero_property_images (property_id, image_order);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_property_images_property_id_idx ON propmls_property_images (property_id, image_order);
+
+-- expression indexes only get planner statistics after an ANALYZE
+ANALYZE resales_property_images;
@@ -0,0 +1,3 @@
+-- Primary WAL position of each feed's last bump (pg_current_wal_lsn()). Until the read replica has
+-- replayed past it, that feed's reads are served by the primary (see db.get_db(min_lsn=...)).
+ALTER TABLE feed_versions ADD COLUMN IF NOT EXISTS lsn pg_lsn;
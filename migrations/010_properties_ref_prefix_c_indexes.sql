@@ -0,0 +1,16 @@
+-- /api/search/suggest prefix matches: LOWER(ref) COLLATE "C" LIKE 'abc%' ORDER BY LOWER(ref) COLLATE "C" LIMIT n.
+-- A "C" index serves both the LIKE range and the ORDER BY (text_pattern_ops only serves ORDER BY in
+-- C-collation databases), so the scan stops after n rows however many refs share the prefix.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS resales_properties_ref_prefix_c_idx ON resales_properties ((LOWER(ref) COLLATE "C"));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS kyero_properties_ref_prefix_c_idx ON kyero_properties ((LOWER(ref) COLLATE "C"));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS propmls_properties_ref_prefix_c_idx ON propmls_properties ((LOWER(ref) COLLATE "C"));
+
+-- replaced by the indexes above (migration 004)
+DROP INDEX CONCURRENTLY IF EXISTS resales_properties_ref_prefix_idx;
+DROP INDEX CONCURRENTLY IF EXISTS kyero_properties_ref_prefix_idx;
+DROP INDEX CONCURRENTLY IF EXISTS propmls_properties_ref_prefix_idx;
+
+-- expression indexes only get planner statistics after an ANALYZE
+ANALYZE resales_properties;
+ANALYZE kyero_properties;
+ANALYZE propmls_properties;
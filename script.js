@@ -4,13 +4,45 @@ let propertyPage = 1;
 let contactPage = 1;
 let nextPageCache = [];
 let pageCache = {};
+let pageCursors = {}; // cacheKey -> cursor that fetches that page
+let contactCursors = {}; // `${role}-${page}` -> cursor that fetches that page
 let inSearchMode = false;
+let propertyFilters = ""; // "&min_beds=3&town=Nerja", applied from the filter inputs
 
 const grid = document.getElementById("properties-grid");
 const pageInfo = document.getElementById("pageInfo");
 
 function getCacheKey(feed, page, perPage) {
-  return `${feed}-${page}-${perPage}`;
+  return `${feed}-${page}-${perPage}${propertyFilters}`;
+}
+
+function getPropertiesUrl(feed, page, perPage) {
+  const cursor = pageCursors[getCacheKey(feed, page, perPage)];
+  if (cursor) {
+    return `/api/properties?feed=${feed}&per_page=${perPage}&cursor=${encodeURIComponent(cursor)}${propertyFilters}`;
+  }
+  return `/api/properties?feed=${feed}&page=${page}&per_page=${perPage}${propertyFilters}`;
+}
+
+function readPropertyFilters() {
+  const fields = {
+    min_price: "filterMinPrice",
+    max_price: "filterMaxPrice",
+    min_beds: "filterMinBeds",
+    min_baths: "filterMinBaths",
+    town: "filterTown"
+  };
+  return Object.entries(fields)
+    .map(([param, id]) => [param, document.getElementById(id).value.trim()])
+    .filter(([, value]) => value)
+    .map(([param, value]) => `&${param}=${encodeURIComponent(value)}`)
+    .join("");
+}
+
+function rememberNextCursor(feed, page, perPage, data) {
+  if (data.next_cursor) {
+    pageCursors[getCacheKey(feed, page + 1, perPage)] = data.next_cursor;
+  }
 }
 
 function getItemsPerPage() {
@@ -63,11 +95,12 @@ function fetchProperties(feed, page) {
   grid.classList.remove("fade-in");
   grid.style.opacity = 0;
 
-  fetch(`/api/properties?feed=${feed}&page=${page}&per_page=${perPage}`)
+  fetch(getPropertiesUrl(feed, page, perPage))
     .then(res => res.json())
     .then(data => {
       const properties = data.properties || [];
       pageCache[cacheKey] = properties;
+      rememberNextCursor(feed, page, perPage, data);
       renderProperties(properties);
       nextPageCache = data.next || [];
       pageInfo.textContent = `Page ${page}`;
@@ -82,7 +115,7 @@ function fetchProperties(feed, page) {
     });
 }
 
-function fetchContacts(page = 1) {
+function fetchContacts(page = 1, fresh = false) {
   currentView = "contacts";
   updateViewControls();
 
@@ -92,11 +125,18 @@ function fetchContacts(page = 1) {
   grid.classList.remove("fade-in");
   grid.style.opacity = 0;
 
-  fetch(`/api/contacts?page=${page}&per_page=${perPage}&role=${encodeURIComponent(role)}`)
+  const cursor = contactCursors[`${role}-${page}`];
+  const pageParam = cursor ? `cursor=${encodeURIComponent(cursor)}` : `page=${page}`;
+
+  // fresh=1 right after a delete so the server reads from the primary, not a lagging replica
+  const freshParam = fresh ? "&fresh=1" : "";
+  fetch(`/api/contacts?${pageParam}&per_page=${perPage}&role=${encodeURIComponent(role)}&with_total=1${freshParam}`)
     .then(res => res.json())
     .then(data => {
+      if (data.next_cursor) contactCursors[`${role}-${page + 1}`] = data.next_cursor;
       renderContacts(data.contacts);
-      pageInfo.textContent = `Contacts - Page ${page}`;
+      const totalPages = data.total != null ? Math.max(Math.ceil(data.total / perPage), 1) : null;
+      pageInfo.textContent = totalPages ? `Contacts - Page ${page} of ${totalPages}` : `Contacts - Page ${page}`;
       requestAnimationFrame(() => {
         grid.classList.add("fade-in");
         grid.style.opacity = 1;
@@ -150,7 +190,10 @@ function deleteContact(id) {
   fetch(`/api/contacts/${id}`, { method: "DELETE" })
     .then(res => res.json())
     .then(data => {
-      if (data.success) fetchContacts(contactPage);
+      if (data.success) {
+        contactCursors = {};
+        fetchContacts(contactPage, true);
+      }
       else alert("Delete failed.");
     });
 }
@@ -160,10 +203,11 @@ function preloadNextPage(feed, page) {
   const nextKey = getCacheKey(feed, page, perPage);
   if (pageCache[nextKey]) return;
 
-  fetch(`/api/properties?feed=${feed}&page=${page}&per_page=${perPage}`)
+  fetch(getPropertiesUrl(feed, page, perPage))
     .then(res => res.json())
     .then(data => {
       pageCache[nextKey] = data.properties || [];
+      rememberNextCursor(feed, page, perPage, data);
       nextPageCache = data.next || [];
     })
     .catch(() => {});
@@ -193,6 +237,12 @@ document.getElementById("searchButton").addEventListener("click", () => {
   grid.classList.remove("fade-in");
   grid.style.opacity = 0;
 
+  // A pasted list of refs is resolved in one bulk request
+  if (/[\s,;]/.test(ref)) {
+    searchManyRefs(ref);
+    return;
+  }
+
   fetch(`/api/search?ref=${encodeURIComponent(ref)}`)
     .then(res => res.json())
     .then(data => {
@@ -214,6 +264,63 @@ document.getElementById("searchButton").addEventListener("click", () => {
     });
 });
 
+function searchManyRefs(refs) {
+  fetch("/api/search", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ refs })
+  })
+    .then(res => res.json())
+    .then(data => {
+      const found = Object.values(data.results || {}).flat();
+      if (found.length > 0) {
+        renderProperties(found.map(item => ({ ...item.property, feed: item.feed })));
+      } else {
+        grid.innerHTML = "<p style='grid-column: span 6'>None of these references were found.</p>";
+      }
+      const missing = data.missing || [];
+      pageInfo.textContent = `Found ${Object.keys(data.results || {}).length} refs` +
+        (missing.length ? ` | Not found: ${missing.join(", ")}` : "");
+      requestAnimationFrame(() => {
+        grid.classList.add("fade-in");
+        grid.style.opacity = 1;
+      });
+    })
+    .catch(err => {
+      console.error("Bulk search failed:", err);
+      grid.innerHTML = "<p style='grid-column: span 6'>Search failed. Try again.</p>";
+    });
+}
+
+// 🔎 Reference typeahead
+let suggestTimer = null;
+document.getElementById("searchInput").addEventListener("input", e => {
+  clearTimeout(suggestTimer);
+  const q = e.target.value.trim();
+  const list = document.getElementById("refSuggestions");
+  if (q.length < 2) {
+    list.innerHTML = "";
+    return;
+  }
+  suggestTimer = setTimeout(() => {
+    fetch(`/api/search/suggest?q=${encodeURIComponent(q)}`)
+      .then(res => res.json())
+      .then(data => {
+        list.innerHTML = (data.suggestions || [])
+          .map(s => `<option value="${s.ref}">${s.feed}</option>`)
+          .join("");
+      })
+      .catch(() => {});
+  }, 150);
+});
+
+document.getElementById("applyFilters").addEventListener("click", () => {
+  propertyFilters = readPropertyFilters();
+  propertyPage = 1;
+  inSearchMode = false;
+  fetchProperties(currentFeed, propertyPage);
+});
+
 document.getElementById("searchInput").addEventListener("keydown", e => {
   if (e.key === "Enter") {
     document.getElementById("searchButton").click();
@@ -246,6 +353,7 @@ window.addEventListener("resize", () => {
   if (newPerPage !== lastPerPage) {
     lastPerPage = newPerPage;
     pageCache = {};
+    pageCursors = {};
     fetchProperties(currentFeed, propertyPage);
   }
 });